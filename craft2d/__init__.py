@@ -1 +1,2 @@
 from craft2d.env.environment import Craft2dEnv
+from craft2d.env.vector import Craft2dVecEnv
@@ -0,0 +1,5 @@
+import sys
+
+from craft2d.bench.suite import main
+
+sys.exit(main())
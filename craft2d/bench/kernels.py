@@ -0,0 +1,172 @@
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from craft2d.bench.suite import ACTION_MIXES, make_actions, task_options
+from craft2d.env import kernels
+from craft2d.env.environment import Craft2dEnv
+from craft2d.env.vector import Craft2dVecEnv
+
+
+def make_envs(make):
+    """Reference and kernel backed env, the kernels run uncompiled without numba."""
+    reference = make(backend="python")
+    compiled = make(backend="numba" if kernels.HAS_NUMBA else "kernels-py")
+    return reference, compiled
+
+
+def check_env(size, mix, n_steps, rng) -> int:
+    """Step both backends of Craft2dEnv in lockstep, returns the first bad step.
+
+    Returns -1 when every observation, reward, label and state matched.
+    """
+    reference, compiled = make_envs(
+        lambda backend: Craft2dEnv(size, size, render_mode=None, backend=backend)
+    )
+    options = task_options(mix)
+    reference.reset(seed=0, options=options)
+    compiled.reset(seed=0, options=options)
+
+    for step, action in enumerate(make_actions(mix, n_steps, rng).tolist()):
+        expected = reference.step(action)
+        actual = compiled.step(action)
+        if not (
+            _equal(expected[:4], actual[:4])
+            and expected[4] == actual[4]
+            and _equal(reference.get_state(), compiled.get_state())
+            and reference.objects.positions == compiled.objects.positions
+        ):
+            return step
+        if expected[2]:
+            reference.reset(options=options)
+            compiled.reset(options=options)
+    return -1
+
+
+def check_vec_env(size, mix, num_envs, n_steps, rng) -> int:
+    """Step both backends of Craft2dVecEnv in lockstep, returns the first bad step."""
+    reference, compiled = make_envs(
+        lambda backend: Craft2dVecEnv(num_envs, size, size, backend=backend)
+    )
+    options = task_options(mix)
+    reference.reset(seed=0, options=options)
+    compiled.reset(seed=0, options=options)
+
+    actions = np.stack(
+        [make_actions(mix, n_steps, rng) for _ in range(num_envs)], axis=1
+    )
+    for step in range(n_steps):
+        if not (
+            _equal(reference.step(actions[step]), compiled.step(actions[step]))
+            and _equal(reference.grids, compiled.grids)
+            and _equal(reference.inventories, compiled.inventories)
+        ):
+            return step
+    return -1
+
+
+def time_backends(size, mix, n_steps, rng):
+    """Steps per second of Craft2dEnv with each backend."""
+    actions = make_actions(mix, n_steps, rng).tolist()
+    options = task_options(mix)
+    rates = {}
+    for backend in ("python", "numba"):
+        env = Craft2dEnv(size, size, render_mode=None, backend=backend)
+        env.reset(options=options)
+        env.step(actions[0])
+
+        start = time.perf_counter()
+        for action in actions:
+            if env.step(action)[2]:
+                env.reset(options=options)
+        rates[backend] = n_steps / (time.perf_counter() - start)
+    return rates
+
+
+def time_vec_backends(size, mix, num_envs, n_steps, rng):
+    """Steps per second of Craft2dVecEnv with each backend, counting every world."""
+    actions = np.stack(
+        [make_actions(mix, n_steps, rng) for _ in range(num_envs)], axis=1
+    )
+    options = task_options(mix)
+    rates = {}
+    for backend in ("python", "numba"):
+        env = Craft2dVecEnv(num_envs, size, size, backend=backend)
+        env.reset(seed=0, options=options)
+        env.step(actions[0])
+
+        start = time.perf_counter()
+        for step_actions in actions:
+            env.step(step_actions)
+        rates[backend] = num_envs * n_steps / (time.perf_counter() - start)
+    return rates
+
+
+def _equal(expected, actual):
+    if isinstance(expected, (tuple, list)):
+        return len(expected) == len(actual) and all(
+            _equal(a, b) for a, b in zip(expected, actual)
+        )
+    if isinstance(expected, dict):
+        return expected.keys() == actual.keys() and all(
+            _equal(expected[key], actual[key]) for key in expected
+        )
+    return np.array_equal(expected, actual)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m craft2d.bench.kernels",
+        description=(
+            "Check that the numba backend matches the reference dynamics step by "
+            "step and compare their speed."
+        ),
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[12, 24])
+    parser.add_argument("--steps", type=int, default=5000)
+    parser.add_argument("--num-envs", type=int, default=64)
+    parser.add_argument("--vec-steps", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if not kernels.HAS_NUMBA:
+        print("numba is not installed, checking the uncompiled kernels.")
+
+    rng = np.random.default_rng(args.seed)
+    failed = False
+    for size in args.sizes:
+        for mix in ACTION_MIXES:
+            checks = (
+                ("env", check_env(size, mix, args.steps, rng)),
+                (
+                    "vec_env",
+                    check_vec_env(size, mix, args.num_envs, args.vec_steps, rng),
+                ),
+            )
+            for name, bad_step in checks:
+                status = "ok" if bad_step < 0 else f"MISMATCH at step {bad_step}"
+                print(f"{name:>8} size={size} mix={mix}: {status}")
+                failed |= bad_step >= 0
+
+    if kernels.HAS_NUMBA:
+        for size in args.sizes:
+            for name, rates in (
+                ("step", time_backends(size, "interaction", args.steps, rng)),
+                (
+                    "vec_step",
+                    time_vec_backends(
+                        size, "interaction", args.num_envs, args.vec_steps, rng
+                    ),
+                ),
+            ):
+                print(
+                    f"{name:>8} size={size}: python {rates['python']:,.0f}/s, "
+                    f"numba {rates['numba']:,.0f}/s"
+                )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+# Runs in a fresh interpreter so module caches do not hide the import cost
+IMPORT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import craft2d
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "pygame_imported": "pygame" in sys.modules}))
+"""
+
+
+def bench_import(repeats):
+    times = []
+    pygame_imported = False
+
+    for _ in range(repeats):
+        result = subprocess.run(
+            [sys.executable, "-c", IMPORT_SCRIPT],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        output = json.loads(result.stdout.strip().splitlines()[-1])
+        times.append(output["seconds"])
+        pygame_imported |= output["pygame_imported"]
+    return float(np.median(times)), pygame_imported
+
+
+def bench_construction(render_mode, repeats, size):
+    from craft2d.env.environment import Craft2dEnv
+
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        env = Craft2dEnv(size, size, render_mode=render_mode)
+        env.reset()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def bench_first_render(repeats, size):
+    from craft2d.env.environment import Craft2dEnv
+
+    times = []
+    for _ in range(repeats):
+        env = Craft2dEnv(size, size, render_mode="rgb_array")
+        env.reset()
+        start = time.perf_counter()
+        env.render()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure craft2d import time and environment construction time."
+    )
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--size", type=int, default=12)
+    args = parser.parse_args()
+
+    import_seconds, pygame_imported = bench_import(args.repeats)
+    print(f"import craft2d:                  {import_seconds * 1e3:8.2f} ms")
+    print(f"pygame imported:                 {pygame_imported}")
+
+    for render_mode in (None, "rgb_array"):
+        seconds = bench_construction(render_mode, args.repeats, args.size)
+        print(f"construct + reset ({str(render_mode):>9}): {seconds * 1e3:8.2f} ms")
+
+    seconds = bench_first_render(args.repeats, args.size)
+    print(f"first render (rgb_array):        {seconds * 1e3:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+import argparse
+import json
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from craft2d.env.environment import DOWN, INTERACT, LEFT, RIGHT, UP, Craft2dEnv
+from craft2d.env.vector import Craft2dVecEnv
+
+# Actions that make the advanced weapon and hand it to the princess, valid for
+# the default layout on any map of at least 12x12
+CRAFTING_CHAIN = (
+    [RIGHT, RIGHT, INTERACT, DOWN]
+    + [RIGHT] * 6
+    + [DOWN, INTERACT]
+    + [RIGHT, DOWN, INTERACT] * 3
+    + [LEFT] * 4
+    + [DOWN] * 6
+    + [RIGHT, DOWN, INTERACT] * 2
+    + [LEFT] * 3
+    + [UP] * 7
+    + [INTERACT] * 4
+    + [LEFT] * 3
+    + [DOWN, INTERACT, DOWN, DOWN, INTERACT]
+    + [UP]
+    + [LEFT] * 3
+    + [DOWN] * 6
+    + [RIGHT, DOWN, INTERACT] * 2
+    + [RIGHT] * 4
+    + [UP] * 7
+    + [INTERACT] * 2
+    + [LEFT] * 3
+    + [UP, INTERACT]
+)
+CRAFTING_CHAIN_TASK = {"task_object": "W-ADV", "task_object_count": "M1"}
+DEFAULT_TASK = {"task_object": "WD", "task_object_count": "M1"}
+
+ACTION_MIXES = ("movement", "interaction", "crafting-chain")
+RENDER_MODES = ("rgb_array", "rgb_array-numpy", "human")
+
+
+def make_actions(mix, n_steps, rng):
+    """Scripted action sequence for an action mix."""
+    if mix == "movement":
+        return rng.integers(0, 4, size=n_steps)
+    elif mix == "interaction":
+        actions = rng.integers(0, 4, size=n_steps)
+        actions[rng.random(n_steps) < 0.5] = INTERACT
+        return actions
+    elif mix == "crafting-chain":
+        return np.resize(CRAFTING_CHAIN, n_steps)
+    raise ValueError(f"Unknown action mix: {mix}")
+
+
+def task_options(mix):
+    return CRAFTING_CHAIN_TASK if mix == "crafting-chain" else DEFAULT_TASK
+
+
+def result(benchmark, n, seconds, **params):
+    return {
+        "benchmark": benchmark,
+        **params,
+        "n": n,
+        "seconds": seconds,
+        "ops_per_sec": n / seconds,
+    }
+
+
+def bench_step(size, mix, n_steps, rng):
+    env = Craft2dEnv(size, size, render_mode=None)
+    options = task_options(mix)
+    env.reset(options=options)
+    actions = [int(action) for action in make_actions(mix, n_steps, rng)]
+
+    start = time.perf_counter()
+    for action in actions:
+        _, _, done, _, _ = env.step(action)
+        if done:
+            env.reset(options=options)
+    return result("step", n_steps, time.perf_counter() - start, size=size, mix=mix)
+
+
+def bench_reset(size, n_resets):
+    env = Craft2dEnv(size, size, render_mode=None)
+    env.reset()
+
+    start = time.perf_counter()
+    for _ in range(n_resets):
+        env.reset()
+    return result("reset", n_resets, time.perf_counter() - start, size=size)
+
+
+def bench_observation(size, n_calls):
+    env = Craft2dEnv(size, size, render_mode=None)
+    env.reset()
+
+    start = time.perf_counter()
+    for _ in range(n_calls):
+        env._create_observation()
+    return result("observation", n_calls, time.perf_counter() - start, size=size)
+
+
+def bench_snapshot(size, n_calls):
+    env = Craft2dEnv(size, size, render_mode=None)
+    env.reset(options=CRAFTING_CHAIN_TASK)
+    for action in CRAFTING_CHAIN[: len(CRAFTING_CHAIN) // 2]:
+        env.step(action)
+
+    start = time.perf_counter()
+    for _ in range(n_calls):
+        env.set_state(env.get_state())
+    return result("snapshot", n_calls, time.perf_counter() - start, size=size)
+
+
+def bench_vec_step(size, mix, num_envs, n_steps, rng):
+    env = Craft2dVecEnv(num_envs, size, size)
+    env.reset(options=task_options(mix))
+    actions = np.stack([make_actions(mix, n_steps, rng) for _ in range(num_envs)], 1)
+
+    start = time.perf_counter()
+    for step_actions in actions:
+        env.step(step_actions)
+    return result(
+        "vec_step",
+        num_envs * n_steps,
+        time.perf_counter() - start,
+        size=size,
+        mix=mix,
+        num_envs=num_envs,
+    )
+
+
+def bench_render(size, render_mode, mix, n_frames, rng):
+    if render_mode == "rgb_array-numpy":
+        env = Craft2dEnv(size, size, render_mode="rgb_array", render_backend="numpy")
+    else:
+        env = Craft2dEnv(size, size, render_mode=render_mode)
+    options = task_options(mix)
+    env.reset(options=options)
+    actions = [int(action) for action in make_actions(mix, n_frames, rng)]
+
+    # First frame builds the renderer, human frames are not limited by the clock
+    env.render()
+    if render_mode == "human":
+        env.renderer.fps = 0
+
+    start = time.perf_counter()
+    for action in actions:
+        _, _, done, _, _ = env.step(action)
+        if done:
+            env.reset(options=options)
+        env.render()
+    return result(
+        "render",
+        n_frames,
+        time.perf_counter() - start,
+        size=size,
+        render_mode=render_mode,
+        mix=mix,
+    )
+
+
+def run(args):
+    rng = np.random.default_rng(args.seed)
+    results = []
+
+    for size in args.sizes:
+        results.append(bench_reset(size, args.steps))
+        results.append(bench_observation(size, args.steps))
+        results.append(bench_snapshot(size, args.steps))
+
+        for mix in args.mixes:
+            results.append(bench_step(size, mix, args.steps, rng))
+            results.append(
+                bench_vec_step(size, mix, args.num_envs, args.vec_steps, rng)
+            )
+            for render_mode in args.render_modes:
+                results.append(bench_render(size, render_mode, mix, args.frames, rng))
+
+    return {
+        "metadata": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "arguments": vars(args),
+        },
+        "results": results,
+    }
+
+
+def result_key(entry):
+    params = {
+        key: value
+        for key, value in entry.items()
+        if key not in ("n", "seconds", "ops_per_sec")
+    }
+    return json.dumps(params, sort_keys=True)
+
+
+def compare(report, baseline, tolerance):
+    """Print throughput relative to a baseline report, returns the regressions."""
+    baseline_results = {result_key(entry): entry for entry in baseline["results"]}
+    regressions = []
+
+    for entry in report["results"]:
+        base = baseline_results.get(result_key(entry))
+        if base is None:
+            continue
+
+        ratio = entry["ops_per_sec"] / base["ops_per_sec"]
+        flag = ""
+        if ratio < 1 - tolerance:
+            regressions.append(entry)
+            flag = "  REGRESSION"
+        print(f"{ratio:6.2f}x  {result_key(entry)}{flag}", file=sys.stderr)
+    return regressions
+
+
+def print_summary(report):
+    for entry in report["results"]:
+        params = ", ".join(
+            f"{key}={value}"
+            for key, value in entry.items()
+            if key not in ("benchmark", "n", "seconds", "ops_per_sec")
+        )
+        print(
+            f"{entry['benchmark']:>12} {entry['ops_per_sec']:>14,.0f}/s  {params}",
+            file=sys.stderr,
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m craft2d.bench",
+        description=(
+            "Measure Craft2d step, reset, observation, snapshot and render "
+            "throughput."
+        ),
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[12, 24, 48])
+    parser.add_argument(
+        "--mixes", nargs="+", choices=ACTION_MIXES, default=list(ACTION_MIXES)
+    )
+    parser.add_argument(
+        "--render-modes",
+        nargs="*",
+        choices=RENDER_MODES,
+        default=["rgb_array", "rgb_array-numpy"],
+        help="Render modes to measure, human needs a display.",
+    )
+    parser.add_argument("--steps", type=int, default=5000)
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--num-envs", type=int, default=256)
+    parser.add_argument("--vec-steps", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON report to this file.")
+    parser.add_argument("--compare", help="Baseline JSON report to compare with.")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.1,
+        help="Relative slowdown against the baseline reported as a regression.",
+    )
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    print_summary(report)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        if compare(report, baseline, args.tolerance):
+            return 1
+    return 0
@@ -0,0 +1,58 @@
+import argparse
+import time
+
+import numpy as np
+
+from craft2d.env.environment import Craft2dEnv
+from craft2d.env.vector import Craft2dVecEnv
+
+
+def bench_env_loop(num_envs, n_rows, n_cols, n_steps, actions):
+    envs = [Craft2dEnv(n_rows, n_cols, render_mode=None) for _ in range(num_envs)]
+    for env in envs:
+        env.reset()
+
+    start = time.perf_counter()
+    for t in range(n_steps):
+        for env, action in zip(envs, actions[t]):
+            _, _, done, _, _ = env.step(int(action))
+            if done:
+                env.reset()
+    return num_envs * n_steps / (time.perf_counter() - start)
+
+
+def bench_vec_env(num_envs, n_rows, n_cols, n_steps, actions):
+    env = Craft2dVecEnv(num_envs, n_rows, n_cols)
+    env.reset()
+
+    start = time.perf_counter()
+    for t in range(n_steps):
+        env.step(actions[t])
+    return num_envs * n_steps / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare Craft2dVecEnv with a loop over Craft2dEnv instances."
+    )
+    parser.add_argument("--num-envs", type=int, nargs="+", default=[1, 64, 1024])
+    parser.add_argument("--size", type=int, default=12)
+    parser.add_argument("--steps", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+
+    print(f"{'envs':>8} {'loop steps/s':>14} {'vec steps/s':>14} {'speedup':>8}")
+    for num_envs in args.num_envs:
+        actions = rng.integers(0, 5, size=(args.steps, num_envs))
+        loop_sps = bench_env_loop(num_envs, args.size, args.size, args.steps, actions)
+        vec_sps = bench_vec_env(num_envs, args.size, args.size, args.steps, actions)
+        print(
+            f"{num_envs:>8} {loop_sps:>14,.0f} {vec_sps:>14,.0f} "
+            f"{vec_sps / loop_sps:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
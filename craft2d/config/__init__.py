@@ -0,0 +1 @@
+from craft2d.config.recipes import COLLECTIBLES, RECIPES, Collectible, Recipe
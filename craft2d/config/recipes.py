@@ -0,0 +1,41 @@
+from typing import NamedTuple
+
+
+class Recipe(NamedTuple):
+    """Inventory object crafted at the crafting table.
+
+    Ingredients map inventory objects to the count that is needed and used up,
+    crafting reports interaction_props (props, "CL").
+    """
+
+    product: str
+    ingredients: dict
+    props: str
+
+
+class Collectible(NamedTuple):
+    """Environment object collected into the inventory, reported as (props, "CL")."""
+
+    env_object: str
+    inventory_object: str
+    props: str
+
+
+# Recipes are tried in stages. In every stage the first recipe with enough
+# ingredients is crafted, later stages see the inventory left by earlier ones and
+# the last crafted recipe sets the interaction props
+RECIPES = (
+    (Recipe("weapon-advanced", {"weapon-basic": 1, "gem": 1}, "W-ADV"),),
+    (
+        Recipe("weapon-basic", {"sticks": 1, "stone": 2}, "W-BSC"),
+        Recipe("bridge", {"sticks": 1, "rope": 1}, "BRG"),
+        Recipe("sticks", {"wood": 2}, "STKS"),
+        Recipe("rope", {"grass": 2}, "RP"),
+    ),
+)
+COLLECTIBLES = (
+    Collectible("tree", "wood", "WD"),
+    Collectible("stone", "stone", "STN"),
+    Collectible("grass", "grass", "GRS"),
+    Collectible("gem", "gem", "GM"),
+)
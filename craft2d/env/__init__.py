@@ -0,0 +1,5 @@
+from craft2d.env.async_vector import Craft2dAsyncVecEnv
+from craft2d.env.environment import Craft2dEnv
+from craft2d.env.generator import LayoutBank, WorldGenerator
+from craft2d.env.reward_machine import RewardMachine, RewardMachineRunner
+from craft2d.env.vector import Craft2dVecEnv
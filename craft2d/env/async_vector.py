@@ -0,0 +1,316 @@
+import multiprocessing as mp
+import traceback
+from multiprocessing.shared_memory import SharedMemory
+
+import gymnasium as gym
+import numpy as np
+
+from craft2d.env.environment import Craft2dEnv
+from craft2d.env.vector import INTERACTION_CODES, INTERACTION_PROPS, TASK_SET
+
+DEFAULT_OPTIONS = {"task_object": "WD", "task_object_count": "M1"}
+
+
+def _buffer_specs(num_envs, grid_shape):
+    """Name, shape and dtype of every shared buffer."""
+    return (
+        ("actions", (num_envs,), np.int64),
+        ("positions", (num_envs, 2), np.int64),
+        ("grids", (num_envs,) + grid_shape, np.int64),
+        ("directions", (num_envs, 4), np.float64),
+        ("interactions", (num_envs,), np.int8),
+        ("rewards", (num_envs,), np.float64),
+        ("dones", (num_envs,), bool),
+        ("truncated", (num_envs,), bool),
+        ("final_positions", (num_envs, 2), np.int64),
+        ("final_grids", (num_envs,) + grid_shape, np.int64),
+        ("final_directions", (num_envs, 4), np.float64),
+        ("final_interactions", (num_envs,), np.int8),
+    )
+
+
+def _attach_buffers(specs, memories):
+    return {
+        name: np.ndarray(shape, dtype=dtype, buffer=memories[name].buf)
+        for name, shape, dtype in specs
+    }
+
+
+def _write_observation(buffers, env_idx, obs, prefix=""):
+    position, grid, direction, props = obs
+    buffers[prefix + "positions"][env_idx] = position
+    buffers[prefix + "grids"][env_idx] = grid
+    buffers[prefix + "directions"][env_idx] = direction
+    buffers[prefix + "interactions"][env_idx] = INTERACTION_CODES.get(props, TASK_SET)
+
+
+def _worker(remote, parent_remote, specs, memory_names, env_indices, env_kwargs):
+    parent_remote.close()
+    memories = {name: SharedMemory(name=memory_names[name]) for name, _, _ in specs}
+    buffers = _attach_buffers(specs, memories)
+    envs = [Craft2dEnv(render_mode=None, **env_kwargs) for _ in env_indices]
+    options = [DEFAULT_OPTIONS] * len(envs)
+
+    try:
+        while True:
+            command, data = remote.recv()
+
+            if command == "step":
+                actions = buffers["actions"]
+                for env, env_idx, env_options in zip(envs, env_indices, options):
+                    obs, reward, done, truncated, _ = env.step(int(actions[env_idx]))
+                    buffers["rewards"][env_idx] = reward
+                    buffers["dones"][env_idx] = done
+                    buffers["truncated"][env_idx] = truncated
+
+                    # Finished episodes are reset, the last observation is kept
+                    if done or truncated:
+                        _write_observation(buffers, env_idx, obs, prefix="final_")
+                        obs = env.reset(options=env_options)
+                    _write_observation(buffers, env_idx, obs)
+                remote.send((True, None))
+            elif command == "reset":
+                seeds, options = data
+                for env, env_idx, seed, env_options in zip(
+                    envs, env_indices, seeds, options
+                ):
+                    _write_observation(
+                        buffers, env_idx, env.reset(seed=seed, options=env_options)
+                    )
+                remote.send((True, None))
+            elif command == "close":
+                remote.send((True, None))
+                break
+            else:
+                raise ValueError(f"Unknown command: {command}")
+    except KeyboardInterrupt:
+        pass
+    except Exception:
+        remote.send((False, traceback.format_exc()))
+    finally:
+        del buffers
+        for memory in memories.values():
+            memory.close()
+
+
+class Craft2dAsyncVecEnv:
+    """Craft2dEnv instances stepped in a pool of worker processes.
+
+    Actions, observations, rewards and done flags are exchanged through shared
+    memory, the pipes to the workers only carry short commands. Observations use
+    the batched layout of Craft2dVecEnv: (positions (N, 2), local grids,
+    directions (N, 4), interaction codes (N,)). Finished episodes are reset
+    automatically, their last observation is in info["final_observation"].
+
+    Args:
+        num_envs: Number of environments.
+        n_rows: Number of rows in each grid.
+        n_cols: Number of columns in each grid.
+        num_workers: Number of worker processes, defaults to one per CPU.
+        context: Multiprocessing start method, for example "fork" or "spawn".
+        view_radius: View radius of the local grid observation.
+    """
+
+    def __init__(
+        self,
+        num_envs: int,
+        n_rows: int,
+        n_cols: int,
+        num_workers: int = None,
+        context: str = None,
+        view_radius: int = 1,
+    ):
+        self.num_envs = num_envs
+        self.n_rows = n_rows
+        self.n_cols = n_cols
+        self.closed = False
+        self._waiting = False
+
+        single_env = Craft2dEnv(
+            n_rows, n_cols, render_mode=None, view_radius=view_radius
+        )
+        self.single_action_space = single_env.action_space
+        self.action_space = gym.spaces.MultiDiscrete(np.full(num_envs, 5))
+        self.single_observation_space = single_env.observation_space
+        grid_shape = single_env.observation_engine.grid.shape
+
+        # Shared buffers are created here and attached to by name in the workers
+        self._specs = _buffer_specs(num_envs, grid_shape)
+        self._memories = {
+            name: SharedMemory(
+                create=True, size=max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+            )
+            for name, shape, dtype in self._specs
+        }
+        self._buffers = _attach_buffers(self._specs, self._memories)
+        memory_names = {name: memory.name for name, memory in self._memories.items()}
+        self._options = [DEFAULT_OPTIONS] * num_envs
+
+        if num_workers is None:
+            num_workers = mp.cpu_count()
+        num_workers = max(min(num_workers, num_envs), 1)
+        self._worker_envs = np.array_split(np.arange(num_envs), num_workers)
+
+        ctx = mp.get_context(context)
+        self._remotes = []
+        self._processes = []
+        env_kwargs = {"n_rows": n_rows, "n_cols": n_cols, "view_radius": view_radius}
+        for env_indices in self._worker_envs:
+            remote, worker_remote = ctx.Pipe()
+            process = ctx.Process(
+                target=_worker,
+                args=(
+                    worker_remote,
+                    remote,
+                    self._specs,
+                    memory_names,
+                    env_indices.tolist(),
+                    env_kwargs,
+                ),
+                daemon=True,
+            )
+            process.start()
+            worker_remote.close()
+            self._remotes.append(remote)
+            self._processes.append(process)
+
+    def reset(self, seed=None, options=None):
+        """Reset every environment.
+
+        Args:
+            seed: Seed for all environments, env i uses seed + i. A list gives one
+                seed per environment.
+            options: Reset options for all environments, or a list with the
+                options of each environment.
+        """
+        self._assert_open()
+        if seed is None or isinstance(seed, int):
+            seeds = [None if seed is None else seed + i for i in range(self.num_envs)]
+        else:
+            seeds = list(seed)
+
+        if options is None:
+            options = DEFAULT_OPTIONS
+        if isinstance(options, dict):
+            options = [options] * self.num_envs
+        self._options = list(options)
+
+        for remote, env_indices in zip(self._remotes, self._worker_envs):
+            remote.send(
+                (
+                    "reset",
+                    (
+                        [seeds[i] for i in env_indices],
+                        [self._options[i] for i in env_indices],
+                    ),
+                )
+            )
+        self._receive()
+        return self._observation()
+
+    def step_async(self, actions: np.ndarray):
+        self._assert_open()
+        if self._waiting:
+            raise RuntimeError("step_async called while waiting for a step.")
+
+        self._buffers["actions"][:] = actions
+        for remote in self._remotes:
+            remote.send(("step", None))
+        self._waiting = True
+
+    def step_wait(self):
+        if not self._waiting:
+            raise RuntimeError("step_wait called without calling step_async.")
+
+        self._waiting = False
+        self._receive()
+
+        dones = self._buffers["dones"].copy()
+        truncated = self._buffers["truncated"].copy()
+        infos = {}
+        finished = dones | truncated
+        if finished.any():
+            infos["final_observation"] = self._observation(prefix="final_")
+            infos["_final_observation"] = finished
+        return (
+            self._observation(),
+            self._buffers["rewards"].copy(),
+            dones,
+            truncated,
+            infos,
+        )
+
+    def step(self, actions: np.ndarray):
+        self.step_async(actions)
+        return self.step_wait()
+
+    def interaction_props(self, interactions: np.ndarray):
+        """Convert interaction codes into the interaction_props of Craft2dEnv."""
+        props = []
+        for code, options in zip(interactions, self._options):
+            if code == TASK_SET:
+                props.append((options["task_object"], options["task_object_count"]))
+            else:
+                props.append(INTERACTION_PROPS[code])
+        return props
+
+    def close(self):
+        if self.closed:
+            return
+
+        if self._waiting:
+            self._waiting = False
+            try:
+                self._receive()
+            except (RuntimeError, EOFError):
+                pass
+
+        for remote, process in zip(self._remotes, self._processes):
+            if process.is_alive():
+                try:
+                    remote.send(("close", None))
+                    remote.recv()
+                except (OSError, EOFError):
+                    pass
+        for remote, process in zip(self._remotes, self._processes):
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+            remote.close()
+
+        self._buffers = None
+        for memory in self._memories.values():
+            memory.close()
+            memory.unlink()
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __del__(self):
+        if not getattr(self, "closed", True):
+            self.close()
+
+    def _observation(self, prefix=""):
+        return (
+            self._buffers[prefix + "positions"].copy(),
+            self._buffers[prefix + "grids"].copy(),
+            self._buffers[prefix + "directions"].copy(),
+            self._buffers[prefix + "interactions"].copy(),
+        )
+
+    def _receive(self):
+        errors = []
+        for remote in self._remotes:
+            success, message = remote.recv()
+            if not success:
+                errors.append(message)
+        if errors:
+            raise RuntimeError("Worker failed:\n" + "\n".join(errors))
+
+    def _assert_open(self):
+        if self.closed:
+            raise RuntimeError("Environment is closed.")
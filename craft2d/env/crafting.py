@@ -0,0 +1,97 @@
+import numpy as np
+
+from craft2d.config import COLLECTIBLES, RECIPES
+
+NO_RECIPE = -1
+
+
+class CraftingRules:
+    """Recipe stages and collectibles compiled into integer arrays.
+
+    Recipe r needs requirements[r] of every inventory object and adds deltas[r]
+    to the inventory. Crafting runs the stages of RECIPES in order, in each stage
+    the first recipe whose requirements are met is applied, so a stage is one
+    masked array operation for one inventory or a batch of them.
+
+    Args:
+        env_objects: Environment object names, cell codes are their index + 1.
+        inv_objects: Inventory object names in inventory order.
+        recipes: Stages of Recipe, see craft2d.config.RECIPES.
+        collectibles: Collectible objects, see craft2d.config.COLLECTIBLES.
+    """
+
+    def __init__(
+        self,
+        env_objects: tuple[str],
+        inv_objects: tuple[str],
+        recipes: tuple = RECIPES,
+        collectibles: tuple = COLLECTIBLES,
+    ):
+        flat_recipes = [recipe for stage in recipes for recipe in stage]
+        n_recipes = len(flat_recipes)
+        self.requirements = np.zeros((n_recipes, len(inv_objects)), np.int64)
+        self.deltas = np.zeros((n_recipes, len(inv_objects)), np.int64)
+        for idx, recipe in enumerate(flat_recipes):
+            for ingredient, count in recipe.ingredients.items():
+                self.requirements[idx, inv_objects.index(ingredient)] = count
+                self.deltas[idx, inv_objects.index(ingredient)] -= count
+            self.deltas[idx, inv_objects.index(recipe.product)] += 1
+        self.recipe_props = tuple((recipe.props, "CL") for recipe in flat_recipes)
+
+        # Recipe indices of every stage, with its rows of the matrices
+        self.stages = []
+        start = 0
+        for stage in recipes:
+            indices = np.arange(start, start + len(stage))
+            self.stages.append(
+                (indices, self.requirements[indices], self.deltas[indices])
+            )
+            start += len(stage)
+
+        # Inventory index and props of collectibles by cell code, None otherwise
+        n_codes = len(env_objects) + 1
+        self.collect_inventory = [None] * n_codes
+        self.collect_props = [None] * n_codes
+        for collectible in collectibles:
+            code = env_objects.index(collectible.env_object) + 1
+            self.collect_inventory[code] = inv_objects.index(
+                collectible.inventory_object
+            )
+            self.collect_props[code] = (collectible.props, "CL")
+        self.collectible_codes = tuple(
+            code for code, idx in enumerate(self.collect_inventory) if idx is not None
+        )
+
+    def craft(self, inventory: np.ndarray):
+        """Craft with one inventory in place, returns the props or None."""
+        props = None
+        for indices, requirements, deltas in self.stages:
+            possible = (inventory >= requirements).all(axis=1)
+            if possible.any():
+                recipe = possible.argmax()
+                inventory += deltas[recipe]
+                props = self.recipe_props[indices[recipe]]
+        return props
+
+    def can_craft(self, inventory: np.ndarray) -> bool:
+        """Whether crafting with inventory makes anything."""
+        return bool((inventory >= self.requirements).all(axis=1).any())
+
+    def can_craft_batch(self, inventories: np.ndarray) -> np.ndarray:
+        return (inventories[:, None, :] >= self.requirements[None]).all(axis=2).any(1)
+
+    def craft_batch(self, inventories: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        """Craft with the inventories where mask is set, in place.
+
+        Returns the last crafted recipe index per inventory, NO_RECIPE where
+        nothing was crafted.
+        """
+        crafted = np.full(len(inventories), NO_RECIPE)
+        for indices, requirements, deltas in self.stages:
+            possible = (inventories[:, None, :] >= requirements[None]).all(axis=2)
+            possible &= mask[:, None]
+            fired = possible.any(axis=1)
+            recipes = possible[fired].argmax(axis=1)
+            inventories[fired] += deltas[recipes]
+            crafted[fired] = indices[recipes]
+        return crafted
@@ -0,0 +1,496 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from heapq import heappop, heappush
+
+import numpy as np
+
+from craft2d.env.environment import (
+    BRIDGE_INV,
+    CRAFTING_TABLE,
+    ENVIRONMENT_OBJECTS,
+    INTERACT,
+    PASSABLE,
+    PRINCESS,
+    PROPS,
+    TASK_COUNTS,
+    TASKS,
+    WATER,
+    Craft2dEnv,
+)
+from craft2d.env.generator import WorldGenerator
+from craft2d.env.recorder import (
+    EPISODE_COLUMNS,
+    STEP_COLUMNS,
+    ColumnStore,
+    TrajectoryDataset,
+    _columns,
+    _empty_rows,
+    _observation_row,
+    _stack_rows,
+    _task_object_code,
+)
+from craft2d.env.vector import DIRECTION_OFFSETS
+
+# Route costs of cells in the way of an unreachable object, clearing a resource
+# takes a turn and an interaction, a bridge has to be crafted first and
+# clearing a resource of the task object may collect more than the task count
+CLEAR_COST = 3
+BRIDGE_COST = 100
+TASK_OBJECT_COST = 1000
+# (row, col) offset of every move action
+MOVES = DIRECTION_OFFSETS[:4].tolist()
+
+
+class ExpertPlanner:
+    """Scripted policy that completes the task of a Craft2dEnv.
+
+    The task object is decomposed into its crafting prerequisites with the
+    crafting rules of the environment: missing ingredients are collected or
+    crafted first, one unit at a time, and the crafting table is only used when
+    crafting makes the next needed object. Once the inventory holds the task
+    count the agent returns to the princess. Every leg walks a shortest path
+    from Craft2dEnv.distance_fields to the nearest object it needs, faces it and
+    interacts. Objects that cannot be reached are routed to through the
+    resources and water in the way, which are collected or bridged first.
+
+    Call reset after every reset of the environment.
+
+    Args:
+        env: Environment to act in.
+    """
+
+    def __init__(self, env: Craft2dEnv):
+        self.env = env
+        rules = env.rules
+
+        # Recipe by inventory index of its product, the first recipe wins
+        self.recipes = {}
+        for recipe, deltas in enumerate(rules.deltas):
+            self.recipes.setdefault(int(deltas.argmax()), recipe)
+        # Cell codes collected into every inventory index
+        self.sources = {}
+        for code in rules.collectible_codes:
+            self.sources.setdefault(rules.collect_inventory[code], []).append(code)
+        self.clearable = tuple(idx is not None for idx in rules.collect_inventory)
+
+        self.reset()
+
+    def reset(self):
+        self.actions = []
+        # Cells only ever become passable, so a reachable princess stays
+        # reachable and a route blocked by water stays blocked until a bridge
+        # is placed
+        self.princess_reachable = False
+        self.awaiting_bridge = None
+
+    def act(self) -> int:
+        """Next action, None when the task cannot be completed from here."""
+        if not self.actions:
+            self.actions = self._plan_leg()
+            if self.actions is None:
+                self.actions = []
+                return None
+        return self.actions.pop()
+
+    def _plan_leg(self):
+        # Actions up to and including the next interaction, in reverse order
+        env = self.env
+        if env.task_index < 0:
+            return None
+
+        held = env.inventory[env.task_index]
+        if held == env.task_count:
+            return self._leg_to((PRINCESS,))
+        if held > env.task_count:
+            return None
+
+        # Resources around an enclosed princess are cleared first, while they
+        # can still count towards the task
+        if not self.princess_reachable:
+            row, col = env.agent_position
+            if self._field((PRINCESS,))[row][col] >= 0:
+                self.princess_reachable = True
+            else:
+                actions = self._clear_route((PRINCESS,))
+                if actions is not None:
+                    return actions
+        codes = self._next_codes(env.task_index, set())
+        if codes is None:
+            return None
+        return self._leg_to(codes)
+
+    def _leg_to(self, codes, bridging=False):
+        env = self.env
+        field = self._field(codes)
+        row, col = env.agent_position
+        if field is not None and field[row][col] >= 0:
+            return self._descend(field, codes)
+        return self._clear_route(codes, bridging)
+
+    def _clear_route(self, codes, bridging=False):
+        # Clear or bridge the first obstacle on the cheapest route, crafting
+        # the bridge first when there is none
+        env = self.env
+        if self.awaiting_bridge != codes or env.inventory[BRIDGE_INV]:
+            path = self._route(codes)
+            if path is None:
+                return None
+            for idx, (row, col) in enumerate(path[1:], 1):
+                if not PASSABLE[env.cells[row, col]]:
+                    break
+            if env.cells[row, col] != WATER or env.inventory[BRIDGE_INV]:
+                self.awaiting_bridge = None
+                return self._walk(path[:idx], path[idx])
+            self.awaiting_bridge = codes
+
+        codes = self._next_codes(BRIDGE_INV, set())
+        if bridging or codes is None:
+            return None
+        return self._leg_to(codes, bridging=True)
+
+    def _next_codes(self, item, visiting):
+        # Cell codes to interact with to get one more of item
+        if item in self.sources:
+            return self.sources[item]
+        recipe = self.recipes.get(item)
+        if recipe is None or item in visiting:
+            return None
+        visiting.add(item)
+
+        env = self.env
+        inventory = env.inventory
+        missing = np.flatnonzero(inventory < env.rules.requirements[recipe])
+        if len(missing):
+            return self._next_codes(int(missing[0]), visiting)
+
+        # Surplus from cleared resources can make an earlier recipe fire
+        # instead, crafting it uses the surplus up as long as the task object
+        # is kept within the task count
+        crafted = inventory.copy()
+        env.rules.craft(crafted)
+        task = env.task_index
+        if (
+            not np.array_equal(crafted, inventory)
+            and inventory[task] <= crafted[task] <= env.task_count
+        ):
+            return (CRAFTING_TABLE,)
+        return None
+
+    def _field(self, codes):
+        # Distances to the nearest of codes, None when none is measured
+        fields = self.env.distance_fields()
+        field = None
+        for code in codes:
+            name = ENVIRONMENT_OBJECTS[code - 1]
+            if name not in fields.targets:
+                continue
+            distances = fields.field(name)
+            if field is not None:
+                distances = np.where(
+                    (field >= 0) & ((distances < 0) | (field < distances)),
+                    field,
+                    distances,
+                )
+            field = distances
+        return None if field is None else field.tolist()
+
+    def _descend(self, field, codes):
+        # Step to a neighbour one closer until next to an object of codes
+        env = self.env
+        cells = env.cells
+        n_rows, n_cols = cells.shape
+        row, col = env.agent_position
+        path = [(row, col)]
+        while field[row][col] > 0:
+            distance = field[row][col] - 1
+            for d_row, d_col in MOVES:
+                n_row, n_col = row + d_row, col + d_col
+                if (
+                    0 <= n_row < n_rows
+                    and 0 <= n_col < n_cols
+                    and field[n_row][n_col] == distance
+                ):
+                    row, col = n_row, n_col
+                    break
+            path.append((row, col))
+
+        # Prefer the object the agent faces at the end of the path
+        facing = self._facing(path)
+        targets = []
+        for action, (d_row, d_col) in enumerate(MOVES):
+            n_row, n_col = row + d_row, col + d_col
+            if 0 <= n_row < n_rows and 0 <= n_col < n_cols:
+                if cells[n_row, n_col] in codes:
+                    targets.append((action != facing, (n_row, n_col)))
+        return self._walk(path, min(targets)[1])
+
+    def _walk(self, path, target):
+        # Moves along path, a turn to face target and the interaction
+        actions = [
+            self._action(path[idx], path[idx + 1]) for idx in range(len(path) - 1)
+        ]
+        action = self._action(path[-1], target)
+        if action != self._facing(path):
+            actions.append(action)
+        actions.append(INTERACT)
+        return actions[::-1]
+
+    def _facing(self, path):
+        # Direction after walking path, None before the first move
+        if len(path) > 1:
+            return self._action(path[-2], path[-1])
+        direction = self.env.direction
+        return int(direction.argmax()) if direction.any() else None
+
+    @staticmethod
+    def _action(position, next_position):
+        offset = [next_position[0] - position[0], next_position[1] - position[1]]
+        return MOVES.index(offset)
+
+    def _route(self, codes):
+        # Cheapest path to an object of codes through cells that can be cleared
+        # or bridged, from the agent to the object
+        env = self.env
+        cells = env.cells.tolist()
+        n_rows, n_cols = env.cells.shape
+        start = env.agent_position
+        task_codes = self.sources.get(env.task_index, ())
+        costs = {start: 0}
+        previous = {}
+        heap = [(0, start)]
+        while heap:
+            cost, (row, col) = heappop(heap)
+            if cost > costs[(row, col)]:
+                continue
+            if cells[row][col] in codes and (row, col) != start:
+                path = [(row, col)]
+                while path[-1] != start:
+                    path.append(previous[path[-1]])
+                return path[::-1]
+
+            for d_row, d_col in MOVES:
+                n_row, n_col = row + d_row, col + d_col
+                if not (0 <= n_row < n_rows and 0 <= n_col < n_cols):
+                    continue
+                code = cells[n_row][n_col]
+                if PASSABLE[code] or code in codes:
+                    step_cost = 1
+                elif code == WATER:
+                    step_cost = BRIDGE_COST
+                elif code in task_codes:
+                    step_cost = TASK_OBJECT_COST
+                elif self.clearable[code]:
+                    step_cost = CLEAR_COST
+                else:
+                    continue
+                neighbour = (n_row, n_col)
+                if cost + step_cost < costs.get(neighbour, cost + step_cost + 1):
+                    costs[neighbour] = cost + step_cost
+                    previous[neighbour] = (row, col)
+                    heappush(heap, (cost + step_cost, neighbour))
+        return None
+
+
+def generate_demonstrations(
+    directory: str,
+    n_episodes: int,
+    n_rows: int = 12,
+    n_cols: int = 12,
+    tasks: dict[str, int] = TASKS,
+    task_object_counts: tuple = ("M1",),
+    view_radius: int = 1,
+    random_layouts: bool = False,
+    seed: int = None,
+    num_workers: int = 1,
+    chunk_size: int = 1000,
+    **generator_kwargs,
+) -> TrajectoryDataset:
+    """Record ExpertPlanner episodes of every task into a TrajectoryDataset.
+
+    Episode i solves task spec i modulo the specs, every task with every count
+    of task_object_counts, from its own reset seed. With random_layouts every
+    episode is played on a WorldGenerator layout drawn from that seed, otherwise
+    on the default layout. Chunks of chunk_size episodes run on num_workers
+    processes and are written to the step and episode columns of
+    TrajectoryRecorder in episode order, so the dataset does not depend on
+    num_workers. Episodes the planner cannot complete are left out and counted
+    in the "n_failed_episodes" entry of the dataset config.
+    """
+    os.makedirs(directory, exist_ok=True)
+    specs = [
+        (PROPS[task_idx], count)
+        for task_idx in tasks.values()
+        for count in task_object_counts
+    ]
+    seeds = np.random.SeedSequence(seed).generate_state(n_episodes).tolist()
+    episodes = [(seeds[idx], *specs[idx % len(specs)]) for idx in range(n_episodes)]
+    chunks = [
+        episodes[start : start + chunk_size]
+        for start in range(0, n_episodes, chunk_size)
+    ]
+
+    config = {"n_rows": n_rows, "n_cols": n_cols, "view_radius": view_radius}
+    if random_layouts:
+        config["generator"] = generator_kwargs
+    window_shape = _make_env(config).observation_engine.grid.shape
+    steps = ColumnStore(
+        directory, "steps", _columns(STEP_COLUMNS, window_shape), 1 << 20
+    )
+    episode_store = ColumnStore(
+        directory, "episodes", _columns(EPISODE_COLUMNS, window_shape), 1 << 14
+    )
+
+    run_chunk = partial(_run_chunk, config)
+    n_failed = 0
+    if num_workers > 1:
+        with ProcessPoolExecutor(num_workers) as executor:
+            n_failed = _store_chunks(
+                executor.map(run_chunk, chunks), steps, episode_store
+            )
+    else:
+        n_failed = _store_chunks(map(run_chunk, chunks), steps, episode_store)
+    steps.flush()
+    episode_store.flush()
+
+    config["n_failed_episodes"] = n_failed
+    with open(os.path.join(directory, "recording.json"), "w") as file:
+        json.dump(config, file)
+    return TrajectoryDataset(directory)
+
+
+def _make_env(config):
+    generator = None
+    if "generator" in config:
+        generator = WorldGenerator(
+            config["n_rows"], config["n_cols"], **config["generator"]
+        )
+    return Craft2dEnv(
+        config["n_rows"],
+        config["n_cols"],
+        render_mode=None,
+        view_radius=config["view_radius"],
+        generator=generator,
+    )
+
+
+def _store_chunks(results, steps, episodes):
+    # Step and episode indices of the chunks start at 0, shift them into place
+    n_failed = 0
+    for step_arrays, episode_arrays, chunk_failed in results:
+        n_failed += chunk_failed
+        if len(episode_arrays["start"]):
+            step_arrays["episode"] += episodes.length
+            episode_arrays["start"] += steps.length
+            steps.append(step_arrays)
+            episodes.append(episode_arrays)
+    return n_failed
+
+
+def _run_chunk(config, episodes):
+    """Columns of the demonstrations of episodes and the number that failed."""
+    env = _make_env(config)
+    planner = ExpertPlanner(env)
+    window_shape = env.observation_engine.grid.shape
+    step_rows = _empty_rows(STEP_COLUMNS)
+    episode_rows = _empty_rows(EPISODE_COLUMNS)
+    n_steps = 0
+    n_failed = 0
+
+    for seed, task_object, task_object_count in episodes:
+        env.reset(
+            seed=seed,
+            options={
+                "task_object": task_object,
+                "task_object_count": task_object_count,
+            },
+        )
+        planner.reset()
+
+        # Rows of the episode are only kept once the task is completed
+        rows = []
+        observation = _observation_row(env)
+        done = False
+        while not done:
+            action = planner.act()
+            if action is None:
+                break
+            _, reward, done, _, _ = env.step(action)
+            rows.append((observation, action, reward, done))
+            observation = _observation_row(env)
+        if not done:
+            n_failed += 1
+            continue
+
+        for (position, grid, direction, props), action, reward, done in rows:
+            step_rows["episode"].append(len(episode_rows["start"]))
+            step_rows["position"].append(position)
+            step_rows["grid"].append(grid)
+            step_rows["direction"].append(direction)
+            step_rows["props"].append(props)
+            step_rows["action"].append(action)
+            step_rows["reward"].append(reward)
+            step_rows["done"].append(done)
+
+        position, grid, direction, props = observation
+        episode_rows["start"].append(n_steps)
+        episode_rows["length"].append(len(rows))
+        episode_rows["seed"].append(seed)
+        episode_rows["task_object"].append(_task_object_code(task_object))
+        episode_rows["task_object_count"].append(TASK_COUNTS.index(task_object_count))
+        episode_rows["final_position"].append(position)
+        episode_rows["final_grid"].append(grid)
+        episode_rows["final_direction"].append(direction)
+        episode_rows["final_props"].append(props)
+        n_steps += len(rows)
+
+    return (
+        _stack_rows(_columns(STEP_COLUMNS, window_shape), step_rows),
+        _stack_rows(_columns(EPISODE_COLUMNS, window_shape), episode_rows),
+        n_failed,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m craft2d.env.demonstrations",
+        description="Record expert demonstrations of every task.",
+    )
+    parser.add_argument("directory", help="Directory of the dataset.")
+    parser.add_argument("--episodes", type=int, default=10000)
+    parser.add_argument("--rows", type=int, default=12)
+    parser.add_argument("--cols", type=int, default=12)
+    parser.add_argument("--counts", nargs="+", default=["M1"], choices=TASK_COUNTS)
+    parser.add_argument("--random-layouts", action="store_true")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    dataset = generate_demonstrations(
+        args.directory,
+        args.episodes,
+        n_rows=args.rows,
+        n_cols=args.cols,
+        task_object_counts=tuple(args.counts),
+        random_layouts=args.random_layouts,
+        seed=args.seed,
+        num_workers=args.workers,
+        chunk_size=args.chunk_size,
+    )
+    elapsed = time.perf_counter() - start
+    print(
+        f"{dataset.n_episodes} episodes, {len(dataset)} steps in {elapsed:.1f}s "
+        f"({len(dataset) / elapsed * 60:,.0f} steps/min), "
+        f"{dataset.config['n_failed_episodes']} episodes failed"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
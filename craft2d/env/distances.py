@@ -0,0 +1,237 @@
+from collections import OrderedDict
+from heapq import heappop, heappush
+
+import numpy as np
+
+from craft2d.env.environment import ENVIRONMENT_OBJECTS, PASSABLE
+
+# Objects distances are measured to, see DistanceFields
+DISTANCE_TARGETS = (
+    "tree",
+    "stone",
+    "grass",
+    "crafting-table",
+    "water",
+    "gem",
+    "princess",
+)
+UNREACHABLE = -1
+# Fields of the most recently used layouts, shared by every environment
+LAYOUT_CACHE_SIZE = 64
+_layout_fields = OrderedDict()
+
+INF = np.iinfo(np.int32).max // 2
+
+
+class DistanceFields:
+    """Shortest path distances from every cell to the objects of each target.
+
+    A distance is the number of moves to a cell next to the nearest object of
+    the target, where the agent can face and interact with it, UNREACHABLE if
+    no such cell can be reached. Fields of a layout are computed once with a
+    multi-source breadth first search and cached by layout. Cells the
+    environment changes afterwards are queued and the fields are repaired
+    around them on the next query: distances that lost their support are
+    raised and recomputed, new paths through collected resources and bridges
+    lower them.
+
+    Create it with Craft2dEnv.distance_fields.
+
+    Args:
+        cells: Cell codes of the environment, read when fields are synced.
+        targets: Names of ENVIRONMENT_OBJECTS to measure distances to.
+    """
+
+    def __init__(self, cells: np.ndarray, targets: tuple = DISTANCE_TARGETS):
+        self.cells = cells
+        self.targets = targets
+        self.n_rows, self.n_cols = cells.shape
+        self.width = self.n_cols + 2
+        self.offsets = (1, -1, self.width, -self.width)
+
+        # Lookup tables by cell code, the last entry is for the border code -1
+        self.passable = tuple(PASSABLE.tolist()) + (False,)
+        self.is_target = [
+            tuple(
+                code == ENVIRONMENT_OBJECTS.index(name) + 1
+                for code in range(len(PASSABLE))
+            )
+            + (False,)
+            for name in targets
+        ]
+
+        self.layout = None
+        self.fields = None
+        # Cells changed since each field was last repaired, by target index
+        self.changes = [set() for _ in targets]
+
+    def load_layout(self, layout: np.ndarray):
+        """Start from a new layout, its fields come from the cache if possible."""
+        key = layout.tobytes()
+        if key in _layout_fields:
+            _layout_fields.move_to_end(key)
+        else:
+            _layout_fields[key] = self._compute(layout)
+            if len(_layout_fields) > LAYOUT_CACHE_SIZE:
+                _layout_fields.popitem(last=False)
+
+        self.layout = np.full((self.n_rows + 2, self.n_cols + 2), -1, dtype=np.int8)
+        self.layout[1:-1, 1:-1] = layout
+        self.layout = self.layout.ravel()
+        self.base_layout = self.layout.copy()
+        self.base_fields = _layout_fields[key]
+        self.fields = self.base_fields.copy()
+        # Cells of the padded layout that differ from the base layout
+        self.differences = set()
+        self.changes = [set() for _ in self.targets]
+        # Cells of the environment that already differ from the layout
+        for row, col in zip(*np.nonzero(self.cells != layout)):
+            self.cell_changed(int(row), int(col))
+
+    def cell_changed(self, row: int, col: int):
+        cell = (row + 1) * self.width + col + 1
+        for changes in self.changes:
+            changes.add(cell)
+
+    def field(self, target: str) -> np.ndarray:
+        """Distances to target by cell with shape (n_rows, n_cols)."""
+        idx = self.targets.index(target)
+        self._sync(idx)
+        field = self.fields[idx].reshape(self.n_rows + 2, self.n_cols + 2)[1:-1, 1:-1]
+        return np.where(field >= INF, UNREACHABLE, field)
+
+    def distance(self, target: str, position: tuple) -> int:
+        """Distance from position to target."""
+        idx = self.targets.index(target)
+        self._sync(idx)
+        row, col = position
+        distance = self.fields[idx, (row + 1) * self.width + col + 1]
+        return UNREACHABLE if distance >= INF else int(distance)
+
+    def distances(self, position: tuple) -> dict:
+        """Distance from position to every target."""
+        for idx in range(len(self.targets)):
+            self._sync(idx)
+        row, col = position
+        distances = self.fields[:, (row + 1) * self.width + col + 1]
+        return {
+            target: UNREACHABLE if distance >= INF else int(distance)
+            for target, distance in zip(self.targets, distances.tolist())
+        }
+
+    def _compute(self, layout):
+        cells = np.full((self.n_rows + 2, self.n_cols + 2), -1, dtype=np.int8)
+        cells[1:-1, 1:-1] = layout
+        cells = cells.ravel()
+        passable = np.array(self.passable)[cells]
+
+        # Level by level breadth first search of every target at once, the
+        # frontier masks spread over the flat padded grid
+        fields = np.full((len(self.targets), len(cells)), INF, dtype=np.int32)
+        frontier = self._neighbours(np.array(self.is_target)[:, cells]) & passable
+        distance = 0
+        while frontier.any():
+            fields[frontier] = distance
+            frontier = self._neighbours(frontier) & passable & (fields == INF)
+            distance += 1
+        return fields
+
+    def _neighbours(self, mask):
+        # Border cells are never passable, so shifts that wrap around rows only
+        # connect border cells
+        out = np.zeros_like(mask)
+        for offset in self.offsets:
+            if offset > 0:
+                out[:, offset:] |= mask[:, :-offset]
+            else:
+                out[:, :offset] |= mask[:, -offset:]
+        return out
+
+    def _sync(self, idx):
+        # Fields are repaired when they are read, so unused targets cost nothing
+        changes = self.changes[idx]
+        if not changes:
+            return
+
+        # Copy the changed cells of the environment into the padded layout
+        cells = self.layout
+        env_cells = self.cells
+        width = self.width
+        for cell in changes:
+            row, col = divmod(cell, width)
+            cells[cell] = env_cells[row - 1, col - 1]
+            if cells[cell] == self.base_layout[cell]:
+                self.differences.discard(cell)
+            else:
+                self.differences.add(cell)
+
+        if not self.differences:
+            # Back to the layout, as after a reset, the cached field holds
+            self.fields[idx] = self.base_fields[idx]
+        else:
+            # Passability and sources can change at the cells and their
+            # neighbours
+            affected = set(changes)
+            for cell in changes:
+                affected.update(cell + offset for offset in self.offsets)
+            self._repair(self.fields[idx], cells, self.is_target[idx], affected)
+        self.changes[idx] = set()
+
+    def _repair(self, distances, cells, is_target, affected):
+        # Works element by element, so the cost follows the repaired region
+        passable = self.passable
+        offsets = self.offsets
+
+        def local_distance(cell):
+            # Distance supported by the neighbours of a cell
+            if not passable[cells[cell]]:
+                return INF
+            if any(is_target[cells[cell + offset]] for offset in offsets):
+                return 0
+            return min(distances[cell + offset] for offset in offsets) + 1
+
+        # Raise: in order of distance, drop the cells left without a neighbour
+        # one closer that is still valid, starting from the affected cells
+        invalid = set()
+        heap = [(distances[cell], cell) for cell in affected if distances[cell] < INF]
+        heap.sort()
+        while heap:
+            distance, cell = heappop(heap)
+            if cell in invalid:
+                continue
+            if passable[cells[cell]]:
+                if distance == 0:
+                    supported = any(is_target[cells[cell + o]] for o in offsets)
+                else:
+                    supported = any(
+                        distances[cell + o] == distance - 1 and cell + o not in invalid
+                        for o in offsets
+                    )
+                if supported:
+                    continue
+            invalid.add(cell)
+            for offset in offsets:
+                if distances[cell + offset] == distance + 1:
+                    heappush(heap, (distance + 1, cell + offset))
+        for cell in invalid:
+            distances[cell] = INF
+
+        # Lower: recompute the dropped and affected cells from their
+        # neighbours and spread every improvement
+        heap = []
+        for cell in invalid | affected:
+            distance = min(local_distance(cell), INF)
+            if not passable[cells[cell]]:
+                distances[cell] = INF
+            elif distance < distances[cell]:
+                distances[cell] = distance
+                heappush(heap, (distance, cell))
+        while heap:
+            distance, cell = heappop(heap)
+            if distance > distances[cell]:
+                continue
+            for offset in offsets:
+                neighbour = cell + offset
+                if passable[cells[neighbour]] and distance + 1 < distances[neighbour]:
+                    distances[neighbour] = distance + 1
+                    heappush(heap, (distance + 1, neighbour))
@@ -0,0 +1,174 @@
+import numpy as np
+
+from craft2d.env.environment import (
+    ENVIRONMENT_OBJECTS,
+    OUT_OF_BOUNDS,
+    PROPS,
+    TASK_COUNTS,
+)
+from craft2d.env.vector import DIRECTION_ONE_HOT, INTERACTION_PROPS, TASK_SET
+
+# Direction index of a one-hot direction, 4 when no direction is set yet
+NO_DIRECTION = 4
+DIRECTION_INDICES = {
+    direction.tobytes(): index
+    for index, direction in enumerate(np.vstack([np.eye(4), np.zeros((1, 4))]))
+}
+# Packed grids are cached by the bytes of the grid, the cache is cleared when full
+GRID_CACHE_SIZE = 1 << 16
+# Props codes extend the interaction codes, TASK_SET is followed by one code per
+# (task_object, task_object_count) pair with task_object None first
+TASK_OBJECTS = (None,) + PROPS
+PROPS_OF_CODES = INTERACTION_PROPS[:TASK_SET] + tuple(
+    (task_object, task_count)
+    for task_object in TASK_OBJECTS
+    for task_count in TASK_COUNTS
+)
+PROPS_CODES = {props: code for code, props in enumerate(PROPS_OF_CODES)}
+
+
+class ObservationEncoder:
+    """Packs observations into single non-negative int64 keys.
+
+    From the least significant bit a key holds the interaction props code, the
+    direction index, every cell of the local grid shifted by one so
+    OUT_OF_BOUNDS becomes 0, the column and the row. Keys of different
+    observations are different, so they can index hash tables or arrays of
+    counts directly.
+
+    Args:
+        n_rows: Number of rows in the grid.
+        n_cols: Number of columns in the grid.
+        view_radius: View radius of the observations, None for the full map.
+    """
+
+    def __init__(self, n_rows: int, n_cols: int, view_radius: int = 1):
+        self.n_rows = n_rows
+        self.n_cols = n_cols
+        if view_radius is None:
+            self.window_shape = (n_rows, n_cols)
+        else:
+            self.window_shape = (2 * view_radius + 1, 2 * view_radius + 1)
+        n_cells = self.window_shape[0] * self.window_shape[1]
+
+        self.props_bits = _bit_length(len(PROPS_OF_CODES))
+        self.direction_bits = _bit_length(NO_DIRECTION + 1)
+        self.cell_bits = _bit_length(len(ENVIRONMENT_OBJECTS) + 1 - OUT_OF_BOUNDS)
+        self.col_bits = _bit_length(n_cols)
+        self.row_bits = _bit_length(n_rows)
+
+        self.direction_shift = self.props_bits
+        self.grid_shift = self.direction_shift + self.direction_bits
+        self.col_shift = self.grid_shift + n_cells * self.cell_bits
+        self.row_shift = self.col_shift + self.col_bits
+        self.n_bits = self.row_shift + self.row_bits
+        if self.n_bits > 63:
+            raise ValueError(
+                f"Observations need {self.n_bits} bits, keys hold at most 63, "
+                "use a smaller view_radius."
+            )
+
+        self._cell_shifts = self.grid_shift + self.cell_bits * np.arange(
+            n_cells, dtype=np.int64
+        )
+        self._cell_mask = (1 << self.cell_bits) - 1
+        # Cells are packed with a dot product, the offset shifts OUT_OF_BOUNDS to 0
+        self._cell_weights = np.left_shift(1, self._cell_shifts)
+        self._cell_offset = -OUT_OF_BOUNDS * int(self._cell_weights.sum())
+        self._grid_cache = {}
+
+    def encode(self, observation: tuple) -> int:
+        """Key of a Craft2dEnv observation (position, grid, direction, props)."""
+        position, grid, direction, interaction_props = observation
+        return self.encode_parts(position.tolist(), grid, direction, interaction_props)
+
+    def encode_parts(
+        self, position: tuple, grid: np.ndarray, direction: np.ndarray, props: tuple
+    ) -> int:
+        """Key of an observation given as its parts, position is a (row, col) tuple."""
+        row, col = position
+
+        # Few distinct windows are seen, looking them up beats packing the cells
+        grid_bytes = grid.tobytes()
+        cells = self._grid_cache.get(grid_bytes)
+        if cells is None:
+            cells = int(grid.ravel().dot(self._cell_weights)) + self._cell_offset
+            if len(self._grid_cache) == GRID_CACHE_SIZE:
+                self._grid_cache.clear()
+            self._grid_cache[grid_bytes] = cells
+
+        direction_idx = DIRECTION_INDICES.get(direction.tobytes())
+        if direction_idx is None:
+            direction_idx = int(direction.argmax()) if direction.any() else NO_DIRECTION
+        return (
+            (row << self.row_shift)
+            | (col << self.col_shift)
+            | cells
+            | (direction_idx << self.direction_shift)
+            | PROPS_CODES[props]
+        )
+
+    def decode(self, key: int) -> tuple:
+        """Observation tuple of a key, the inverse of encode."""
+        positions, grids, directions, props = self.decode_batch(np.array([key]))
+        return positions[0], grids[0], directions[0], PROPS_OF_CODES[props[0]]
+
+    def encode_batch(
+        self,
+        positions: np.ndarray,
+        grids: np.ndarray,
+        directions: np.ndarray,
+        props_codes: np.ndarray,
+    ) -> np.ndarray:
+        """Keys with shape (N,) of batched observations.
+
+        Directions are one-hot with shape (N, 4) or indices with shape (N,),
+        props codes are from props_code or props_codes.
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        if directions.ndim == 2:
+            directions = np.where(
+                directions.any(axis=1), directions.argmax(axis=1), NO_DIRECTION
+            )
+
+        cells = grids.reshape(len(grids), -1).astype(np.int64) - OUT_OF_BOUNDS
+        return (
+            (positions[:, 0] << self.row_shift)
+            | (positions[:, 1] << self.col_shift)
+            | np.bitwise_or.reduce(cells << self._cell_shifts, axis=1)
+            | (directions.astype(np.int64) << self.direction_shift)
+            | props_codes.astype(np.int64)
+        )
+
+    @staticmethod
+    def props_code(interaction_props: tuple) -> int:
+        """Code of the interaction_props of a Craft2dEnv observation."""
+        return PROPS_CODES[interaction_props]
+
+    @staticmethod
+    def props_codes(
+        interactions: np.ndarray, task_objects: np.ndarray, task_counts: np.ndarray
+    ) -> np.ndarray:
+        """Props codes of the interaction codes and task arrays of Craft2dVecEnv."""
+        task_codes = TASK_SET + (task_objects + 1) * len(TASK_COUNTS) + task_counts - 1
+        return np.where(interactions == TASK_SET, task_codes, interactions)
+
+    def decode_batch(self, keys: np.ndarray) -> tuple:
+        """Batched (positions, grids, one-hot directions, props codes) of keys."""
+        keys = np.asarray(keys, dtype=np.int64)
+        positions = np.stack(
+            [
+                (keys >> self.row_shift) & ((1 << self.row_bits) - 1),
+                (keys >> self.col_shift) & ((1 << self.col_bits) - 1),
+            ],
+            axis=1,
+        )
+        cells = (keys[:, None] >> self._cell_shifts) & self._cell_mask
+        grids = (cells + OUT_OF_BOUNDS).reshape(len(keys), *self.window_shape)
+        directions = (keys >> self.direction_shift) & ((1 << self.direction_bits) - 1)
+        props = keys & ((1 << self.props_bits) - 1)
+        return positions, grids, DIRECTION_ONE_HOT[directions], props
+
+
+def _bit_length(n_values):
+    return max(int(n_values - 1).bit_length(), 1)
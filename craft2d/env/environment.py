@@ -1,9 +1,19 @@
+from functools import lru_cache
 from itertools import product
+from typing import TYPE_CHECKING, NamedTuple
 
 import gymnasium as gym
 import numpy as np
 
-from craft2d.render.render import HumanRenderer, RgbRenderer
+from craft2d.config import COLLECTIBLES, RECIPES
+from craft2d.env.crafting import CraftingRules
+from craft2d.env.objects import ObjectIndex
+from craft2d.env.observation import OUT_OF_BOUNDS, ObservationEngine, viewport_origin
+from craft2d.profiling import Profiler
+
+if TYPE_CHECKING:
+    from craft2d.env.distances import DistanceFields
+    from craft2d.env.generator import LayoutBank, WorldGenerator
 
 RIGHT = 0
 LEFT = 1
@@ -61,6 +71,104 @@ PROPS = (
     "GEM",
     "W-ADV",
 )
+TASK_COUNTS = ("M1", "M2", "M3", "M4", "M5")
+
+# Propositions of the labelling function, bit i of a uint16 label is set when
+# proposition i holds. Collecting a gem reports "GM", the gem task object "GEM"
+PROPOSITIONS = PROPS + ("CL", "P") + TASK_COUNTS
+PROPOSITION_BITS = {name: 1 << bit for bit, name in enumerate(PROPOSITIONS)}
+PROPOSITION_BITS["GM"] = PROPOSITION_BITS["GEM"]
+PRINCESS_LABEL = PROPOSITION_BITS["P"]
+
+# Every (task_object, task_object_count) pair, the rewards of
+# reward_mode="all-tasks" follow this order
+TASK_SPECS = tuple(product(PROPS, TASK_COUNTS))
+# Inventory index and count every task spec requires at the princess
+TASK_SPEC_INDICES = np.array([PROPS.index(obj) for obj, _ in TASK_SPECS])
+TASK_SPEC_COUNTS = np.array([TASK_COUNTS.index(count) + 1 for _, count in TASK_SPECS])
+REWARD_MODES = ("task", "all-tasks")
+# Step implementations, "numba" runs the compiled kernels of craft2d.env.kernels,
+# which only speed up Craft2dVecEnv. "kernels-py" runs the same kernels
+# uncompiled, to check them without numba
+BACKENDS = ("python", "numba", "kernels-py")
+
+# Grid cells hold one code per cell, objects are ENVIRONMENT_OBJECTS index + 1
+EMPTY = 0
+TREE = ENVIRONMENT_OBJECTS.index("tree") + 1
+STONE = ENVIRONMENT_OBJECTS.index("stone") + 1
+GRASS = ENVIRONMENT_OBJECTS.index("grass") + 1
+CRAFTING_TABLE = ENVIRONMENT_OBJECTS.index("crafting-table") + 1
+WATER = ENVIRONMENT_OBJECTS.index("water") + 1
+GEM = ENVIRONMENT_OBJECTS.index("gem") + 1
+BRIDGE = ENVIRONMENT_OBJECTS.index("bridge") + 1
+PRINCESS = ENVIRONMENT_OBJECTS.index("princess") + 1
+
+# Lookup tables indexed by cell code
+PASSABLE = np.zeros(len(ENVIRONMENT_OBJECTS) + 1, dtype=bool)
+PASSABLE[[EMPTY, BRIDGE]] = True
+ONE_HOT_CELLS = np.vstack(
+    [np.zeros(len(ENVIRONMENT_OBJECTS)), np.eye(len(ENVIRONMENT_OBJECTS))]
+)
+# Collectibles of the crafting rules are handled by _collect_resource
+INTERACTION_HANDLERS = {
+    "crafting-table": "_handle_crafting_interaction",
+    "water": "_handle_water_interaction",
+}
+BRIDGE_INV = INVENTORY_OBJECTS.index("bridge")
+
+# Methods timed by enable_profiling, for the environment and its renderer
+PROFILED_METHODS = (
+    "step",
+    "_update_agent_position",
+    "_handle_interact_action",
+    "_handle_crafting_interaction",
+    "_create_observation",
+)
+PROFILED_RENDERER_METHODS = (
+    "render",
+    "_render_background",
+    "_render_env_objects",
+    "_render_inventory",
+    "_render_quest",
+    "_update_display",
+)
+
+
+@lru_cache(maxsize=None)
+def props_label(props: tuple) -> int:
+    """Label of interaction props, the bits of their propositions.
+
+    None stands for the task object before it is known and sets no bit.
+    """
+    label = 0
+    for name in props:
+        if name is None:
+            continue
+        if name not in PROPOSITION_BITS:
+            raise ValueError(f"Interaction props {props} have no proposition {name}.")
+        label |= PROPOSITION_BITS[name]
+    return label
+
+
+def label_props(label: int) -> tuple:
+    """Names of the propositions set in label, in PROPOSITIONS order."""
+    return tuple(name for bit, name in enumerate(PROPOSITIONS) if label >> bit & 1)
+
+
+class Craft2dState(NamedTuple):
+    """Dynamic state of a Craft2dEnv, see Craft2dEnv.get_state."""
+
+    cell_changes: tuple
+    inventory: np.ndarray
+    agent_position: tuple
+    direction: np.ndarray
+    task_object: str
+    task_object_count: str
+    task_set: bool
+    task_completed: bool
+    task_failed: bool
+    n_steps: int
+    interaction_props: tuple
 
 
 class Craft2dEnv(gym.Env):
@@ -69,11 +177,30 @@ class Craft2dEnv(gym.Env):
         n_rows: int,
         n_cols: int,
         render_mode: str = "human",
+        view_radius: int = 1,
+        readonly_observations: bool = False,
+        render_backend: str = "pygame",
+        generator: "WorldGenerator" = None,
+        layout_bank: "LayoutBank" = None,
+        observation_mode: str = "tuple",
+        profile: bool = False,
+        recipes: tuple = RECIPES,
+        collectibles: tuple = COLLECTIBLES,
+        reward_mode: str = "task",
+        viewport: tuple[int, int] = None,
+        backend: str = "python",
+        with_action_mask: bool = False,
     ):
         super().__init__()
         self.n_rows = n_rows
         self.n_cols = n_cols
         self.render_mode = render_mode
+        self.view_radius = view_radius
+        self.render_backend = render_backend
+        # Rows and columns around the agent drawn by render, None draws the map
+        self.viewport = None
+        if viewport is not None:
+            self.viewport = (min(viewport[0], n_rows), min(viewport[1], n_cols))
         self.n_env_objects = len(ENVIRONMENT_OBJECTS)
         self.n_inv_objects = len(INVENTORY_OBJECTS)
 
@@ -101,23 +228,65 @@ class Craft2dEnv(gym.Env):
         )
         self.reward_range = (0, 1)
 
-        self.init_required = True
+        # With "all-tasks" step returns the rewards of every task in TASK_SPECS,
+        # the episode still ends on the reward of the task passed to reset
+        if reward_mode not in REWARD_MODES:
+            raise ValueError(f"Unknown reward_mode: {reward_mode}")
+        self.reward_mode = reward_mode
+
+        # Encoded observations are single int64 keys, see ObservationEncoder
+        self.observation_mode = observation_mode
+        self.encoder = None
+        if observation_mode == "encoded":
+            from craft2d.env.encoding import ObservationEncoder
+
+            self.encoder = ObservationEncoder(n_rows, n_cols, view_radius)
+            self.observation_space = gym.spaces.Discrete(1 << self.encoder.n_bits)
+        elif observation_mode != "tuple":
+            raise ValueError(f"Unknown observation_mode: {observation_mode}")
+
+        # Layouts are drawn from the bank, generated on every reset or, with
+        # neither set, the fixed default layout is built once and cached
+        if layout_bank is not None:
+            bank_shape = (layout_bank.n_rows, layout_bank.n_cols)
+            if bank_shape != (n_rows, n_cols):
+                raise ValueError(
+                    f"Layout bank holds {bank_shape[0]}x{bank_shape[1]} layouts, "
+                    f"expected {n_rows}x{n_cols}."
+                )
+        self.generator = generator
+        self.layout_bank = layout_bank
 
-        if self.render_mode == "human":
-            self.renderer = HumanRenderer(
-                n_rows=self.n_rows,
-                n_cols=self.n_cols,
-                env_objects=ENVIRONMENT_OBJECTS,
-                inv_objects=INVENTORY_OBJECTS,
-                fps=24,
-            )
-        elif self.render_mode == "rgb_array":
-            self.renderer = RgbRenderer(
-                n_rows=self.n_rows,
-                n_cols=self.n_cols,
-                env_objects=ENVIRONMENT_OBJECTS,
-                inv_objects=INVENTORY_OBJECTS,
-            )
+        self.init_required = True
+        self.observation_engine = ObservationEngine(
+            n_rows=self.n_rows,
+            n_cols=self.n_cols,
+            view_radius=view_radius,
+            readonly_views=readonly_observations,
+        )
+        self.recipes = recipes
+        self.collectibles = collectibles
+        self.rules = CraftingRules(
+            ENVIRONMENT_OBJECTS, INVENTORY_OBJECTS, recipes, collectibles
+        )
+        self._build_interaction_handlers()
+        self._init_backend(backend)
+        # Actions that change the state are returned in info["action_mask"]
+        self.with_action_mask = with_action_mask
+        # Built by the first call to distance_fields
+        self._distance_fields = None
+        # Props outside PROPOSITIONS cannot be labelled, fail before stepping
+        for props in self.rules.recipe_props + tuple(self.rules.collect_props):
+            if props is not None:
+                props_label(props)
+
+        # Renderer is built on the first call to render, importing pygame then
+        self.renderer = None
+
+        self.profiler = None
+        self.profiling = False
+        if profile:
+            self.enable_profiling()
 
     def reset(
         self,
@@ -128,75 +297,88 @@ class Craft2dEnv(gym.Env):
         },
     ):
         super().reset(seed=seed)
-        np.random.seed(seed)
         # Reset number of steps taken in environment
         self.n_steps = 0
 
         # Reset task state
         self.task_object = options["task_object"]
         self.task_object_count = options["task_object_count"]
+        self._compile_task()
         self.task_set = False
         self.task_completed = False
         self.task_failed = False
 
-        # Object order specified in ENVIRONMENT_OBJECTS
-        self.grid = np.zeros((self.n_rows, self.n_cols, self.n_env_objects))
+        # Cell codes, see EMPTY and the object codes derived from ENVIRONMENT_OBJECTS
+        self.cells = self.observation_engine.cells
         # Object order specified in INVENTORY_OBJECTS
         self.inventory = np.zeros((self.n_inv_objects,))
 
         # Initialize agent position and direction
         self.agent_position = (0, 0)
         self.direction = np.zeros((4,))
-
-        if self.init_required:
+        # Index of the direction for the compiled step, 4 before the first move
+        self._direction_index = 4
+
+        # New layouts are copied in and indexed, the cached layout is restored
+        # from the cells changed during the last episode so large maps are never
+        # scanned on reset
+        if self.layout_bank is not None:
+            self._load_layout(np.array(self.layout_bank.sample(self.np_random)))
+        elif self.generator is not None:
+            self._load_layout(self.generator.generate(self.np_random))
+        elif self.init_required:
             self.init_required = False
 
-            # Add resources to environment
+            # Add resources to environment and setup island
+            self.cells[:] = EMPTY
+            self.objects = ObjectIndex(self.n_env_objects + 1)
             self._initialize_environment()
-            self.cached_grid = self.grid.copy()
+            self._initialize_island()
+            self.cached_cells = self.cells.copy()
+            self.cached_objects = self.objects.copy()
         else:
-            self.grid = self.cached_grid.copy()
-
-        # Setup island
-        self._initialize_island()
+            for row, col in self.cell_changes:
+                self._write_cell(row, col, self.cached_cells[row, col])
+        # Cells changed since reset by (row, col), used for cheap snapshots
+        self.cell_changes = {}
 
         self.interaction_props = ()
+        self.labels = 0
         return self._create_observation()
 
     def step(self, action: int):
-        self.interaction_props = ()
-
-        if action == INTERACT:
-            self._handle_interact_action()
+        if self._step_kernel is not None:
+            self._step_compiled(action)
         else:
-            self._update_agent_position(action)
-            self._update_agent_direction(action)
+            self.interaction_props = ()
+
+            if action == INTERACT:
+                self._handle_interact_action()
+            else:
+                self._update_agent_position(action)
+                self._update_agent_direction(action)
 
         obs = self._create_observation()
         reward = 0
 
         # Reward = 1 when agent interacts with princess while holding task object
-        props = obs[-1]
-        if props == ("P",) and self.task_object is not None:
-            task_obj_idx = PROPS.index(self.task_object)
-
-            if self.task_object_count == "M1":
-                count = 1
-            elif self.task_object_count == "M2":
-                count = 2
-            elif self.task_object_count == "M3":
-                count = 3
-            elif self.task_object_count == "M4":
-                count = 4
-            elif self.task_object_count == "M5":
-                count = 5
-
-            if self.inventory[task_obj_idx] == count:
-                reward = 1
-                self.task_completed = True
+        labels = self.labels = props_label(self.interaction_props)
+        if (
+            labels == PRINCESS_LABEL
+            and self.task_index >= 0
+            and self.inventory[self.task_index] == self.task_count
+        ):
+            reward = 1
+            self.task_completed = True
 
         done = reward == 1
-        return obs, reward, done, False, {}
+        info = {"labels": labels}
+        if self.with_action_mask:
+            info["action_mask"] = self.action_mask()
+        if self.reward_mode == "all-tasks":
+            info["task_reward"] = reward
+            reward = self._all_task_rewards(labels)
+        return obs, reward, done, False, info
 
     def render(self):
         if self.render_mode is None:
@@ -209,10 +391,27 @@ class Craft2dEnv(gym.Env):
             return
 
         if self.render_mode in ("human", "rgb_array"):
+            if self.renderer is None:
+                self.renderer = self._make_renderer()
+                if self.profiling:
+                    self.profiler.instrument(
+                        self.renderer, PROFILED_RENDERER_METHODS, "renderer."
+                    )
+
+            grid = self.cells
+            agent_position = self.agent_position
+            if self.viewport is not None:
+                # Camera follows the agent, only the window around it is drawn
+                row, col = viewport_origin(
+                    np.asarray(agent_position), self.viewport, self.n_rows, self.n_cols
+                )
+                grid = grid[row : row + self.viewport[0], col : col + self.viewport[1]]
+                agent_position = (agent_position[0] - row, agent_position[1] - col)
+
             return self.renderer.render(
-                grid=self.grid,
+                grid=grid,
                 inventory=self.inventory,
-                agent_position=self.agent_position,
+                agent_position=agent_position,
                 direction=self.direction,
                 quest_set=self.task_set,
                 quest_object=self.task_object,
@@ -221,41 +420,311 @@ class Craft2dEnv(gym.Env):
                 failed=self.task_failed,
             )
 
-    def _create_observation(self):
-        # Fill observation with out of bounds
-        obs_grid = np.full((3, 3), fill_value=-1)
+    def distance_fields(self) -> "DistanceFields":
+        """Shortest path distances to every object type, see DistanceFields.
+
+        The fields follow the environment from then on, call after reset.
+        """
+        if self._distance_fields is None:
+            from craft2d.env.distances import DistanceFields
+
+            self._distance_fields = DistanceFields(self.cells)
+            self._distance_fields.load_layout(self.cached_cells)
+        return self._distance_fields
+
+    def action_mask(self) -> np.ndarray:
+        """Actions that change the state, a bool array indexed by action.
+
+        Moving into a blocked cell still turns the agent, so only moving on in
+        the facing direction can be a no-op. INTERACT is valid at the princess
+        and, once there is a task object, at collectibles, at water with a
+        bridge in the inventory and at the crafting table when a recipe can be
+        crafted.
+        """
+        mask = np.ones(5, dtype=bool)
+        if not self.direction.any():
+            # Without a direction the agent interacts with its own cell
+            mask[INTERACT] = False
+            return mask
 
-        for d_r, d_c in product(range(-1, 2), range(-1, 2)):
-            n_r = self.agent_position[0] + d_r
-            n_c = self.agent_position[1] + d_c
+        itr_row, itr_col = self._get_interaction_cell()
+        cell = self.cells[itr_row, itr_col]
+        if (itr_row, itr_col) == self.agent_position or not PASSABLE[cell]:
+            mask[self.direction.argmax()] = False
 
-            # Test if out of bounds
-            if (n_r >= self.n_rows or n_r < 0) or (n_c >= self.n_cols or n_c < 0):
-                continue
+        if cell == PRINCESS:
+            return mask
+        if self.task_object is None:
+            mask[INTERACT] = False
+        elif cell == WATER:
+            mask[INTERACT] = self.inventory[BRIDGE_INV] > 0
+        elif cell == CRAFTING_TABLE:
+            mask[INTERACT] = self.rules.can_craft(self.inventory)
+        else:
+            mask[INTERACT] = self.rules.collect_inventory[cell] is not None
+        return mask
 
-            if np.max(self.grid[n_r, n_c]) == 0:
-                # Empty cell
-                obs_grid[d_r + 1, d_c + 1] = 0
-            else:
-                # Object
-                obs_grid[d_r + 1, d_c + 1] = np.argmax(self.grid[n_r, n_c]) + 1
+    def enable_profiling(self, max_samples: int = 100_000):
+        """Start timing the phases in PROFILED_METHODS and PROFILED_RENDERER_METHODS.
 
-        if self.task_object is None:
-            task_collected = np.array([0])
+        The methods are replaced by timed wrappers on this instance only, until
+        disable_profiling removes them, so environments that are not profiled run
+        without any overhead.
+        """
+        if self.profiling:
+            return
+        if self.profiler is None:
+            self.profiler = Profiler(max_samples)
+
+        self.profiler.instrument(self, PROFILED_METHODS, "env.")
+        if self.renderer is not None:
+            self.profiler.instrument(
+                self.renderer, PROFILED_RENDERER_METHODS, "renderer."
+            )
+        self._build_interaction_handlers()
+        self.profiling = True
+
+    def disable_profiling(self):
+        """Stop timing, the times recorded so far stay in profile_report."""
+        if not self.profiling:
+            return
+
+        Profiler.restore(self, PROFILED_METHODS)
+        if self.renderer is not None:
+            Profiler.restore(self.renderer, PROFILED_RENDERER_METHODS)
+        self._build_interaction_handlers()
+        self.profiling = False
+
+    def profile_report(self, path: str = None) -> dict:
+        """Count, total, mean, max and percentile wall times in seconds per phase.
+
+        The report is also written to path as JSON when it is given.
+        """
+        if self.profiler is None:
+            return {}
+        if path is not None:
+            self.profiler.dump_json(path)
+        return self.profiler.report()
+
+    def get_state(self) -> Craft2dState:
+        """Snapshot of the dynamic state, the cost grows with the changed cells.
+
+        Cells are stored as the changes since reset, the layout itself is shared
+        with the cached grid of the environment.
+        """
+        return Craft2dState(
+            cell_changes=tuple(self.cell_changes.items()),
+            inventory=self.inventory.copy(),
+            agent_position=self.agent_position,
+            direction=self.direction.copy(),
+            task_object=self.task_object,
+            task_object_count=self.task_object_count,
+            task_set=self.task_set,
+            task_completed=self.task_completed,
+            task_failed=self.task_failed,
+            n_steps=self.n_steps,
+            interaction_props=self.interaction_props,
+        )
+
+    def set_state(self, state: Craft2dState):
+        """Restore a snapshot from get_state, returns the matching observation.
+
+        Only the cells changed in the current or restored state are written.
+        """
+        for row, col in self.cell_changes:
+            self._write_cell(row, col, self.cached_cells[row, col])
+        self.cell_changes = dict(state.cell_changes)
+        for (row, col), code in state.cell_changes:
+            self._write_cell(row, col, code)
+
+        np.copyto(self.inventory, state.inventory)
+        self.agent_position = state.agent_position
+        np.copyto(self.direction, state.direction)
+        self._direction_index = (
+            int(state.direction.argmax()) if state.direction.any() else 4
+        )
+        self.task_object = state.task_object
+        self.task_object_count = state.task_object_count
+        self._compile_task()
+        self.task_set = state.task_set
+        self.task_completed = state.task_completed
+        self.task_failed = state.task_failed
+        self.n_steps = state.n_steps
+        self.interaction_props = state.interaction_props
+        self.labels = props_label(state.interaction_props)
+        return self._create_observation()
+
+    def clone(self) -> "Craft2dEnv":
+        """Copy of the environment that shares the layout but not the renderer."""
+        env = Craft2dEnv(
+            self.n_rows,
+            self.n_cols,
+            render_mode=self.render_mode,
+            view_radius=self.view_radius,
+            readonly_observations=self.observation_engine.readonly_views,
+            render_backend=self.render_backend,
+            generator=self.generator,
+            layout_bank=self.layout_bank,
+            observation_mode=self.observation_mode,
+            recipes=self.recipes,
+            collectibles=self.collectibles,
+            reward_mode=self.reward_mode,
+            viewport=self.viewport,
+            backend=self.backend,
+            with_action_mask=self.with_action_mask,
+        )
+        env.init_required = False
+        env.cached_cells = self.cached_cells
+        env.cells = env.observation_engine.cells
+        np.copyto(env.cells, self.cached_cells)
+        env.cached_objects = self.cached_objects
+        env.objects = self.cached_objects.copy()
+        env.cell_changes = {}
+        env.inventory = np.zeros_like(self.inventory)
+        env.direction = np.zeros_like(self.direction)
+        env.set_state(self.get_state())
+        return env
+
+    def __setstate__(self, state):
+        # Copies and unpickled environments get detached arrays, point cells
+        # back at the grid of the copied observation engine
+        self.__dict__.update(state)
+        if "cells" in state:
+            self.cells = self.observation_engine.cells
+            if self._distance_fields is not None:
+                self._distance_fields.cells = self.cells
+
+    def _init_backend(self, backend: str):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend: {backend}")
+        self.backend = backend
+        self._step_kernel = None
+        if backend == "python":
+            return
+
+        from craft2d.env import kernels
+
+        tables = kernels.build_tables(self.rules)
+        self._kernel_props = kernels.INTERACTION_PROPS
+        if backend == "kernels-py":
+            self._step_kernel = kernels.bind_step(tables, compiled=False)
+        elif kernels.HAS_NUMBA:
+            self._step_kernel = kernels.bind_step(tables)
+            # Calling into compiled code costs more than a Python step of one
+            # world, only the loop over many worlds in Craft2dVecEnv gains
+            gym.logger.warn(
+                "backend='numba' steps a single Craft2dEnv slower than the python "
+                "backend, use Craft2dVecEnv for compiled speedups."
+            )
         else:
-            task_collected = np.array([1])
-
-        return (
-            np.array([self.agent_position[0], self.agent_position[1]]).copy(),
-            obs_grid.copy(),
-            self.direction.copy(),
-            # task_collected,
-            self.interaction_props,
+            gym.logger.warn(
+                "numba is not installed, Craft2dEnv falls back to the python backend."
+            )
+
+    def _step_compiled(self, action: int):
+        row, col = self.agent_position
+        (
+            row,
+            col,
+            direction,
+            interaction,
+            self.task_set,
+            changed_row,
+            changed_col,
+            old_code,
+        ) = self._step_kernel(
+            self.cells,
+            self.inventory,
+            row,
+            col,
+            self._direction_index,
+            action,
+            self.task_index,
+            self.task_set,
+        )
+
+        # Mirror the kernel results into the Python side state
+        if action != INTERACT:
+            self.last_position = self.agent_position
+            self.agent_position = (int(row), int(col))
+            if direction != self._direction_index:
+                self._direction_index = direction
+                self.direction[:] = 0
+                self.direction[direction] = 1
+        if changed_row >= 0:
+            code = int(self.cells[changed_row, changed_col])
+            self._track_cell(changed_row, changed_col, old_code, code)
+            self.cell_changes[(int(changed_row), int(changed_col))] = code
+        # The props of the task set interaction depend on the task, they are None
+        props = self._kernel_props[interaction]
+        if props is None:
+            props = (self.task_object, self.task_object_count)
+        self.interaction_props = props
+
+    def _build_interaction_handlers(self):
+        # Handlers indexed by cell code, EMPTY has no handler
+        handler_names = [INTERACTION_HANDLERS.get(name) for name in ENVIRONMENT_OBJECTS]
+        for code in self.rules.collectible_codes:
+            handler_names[code - 1] = "_collect_resource"
+        self._interaction_handlers = (None,) + tuple(
+            None if name is None else getattr(self, name) for name in handler_names
+        )
+
+    def _make_renderer(self):
+        from craft2d.render.render import HumanRenderer, NumpyRenderer, RgbRenderer
+
+        n_rows, n_cols = self.viewport or (self.n_rows, self.n_cols)
+
+        if self.render_mode == "human":
+            return HumanRenderer(
+                n_rows=n_rows,
+                n_cols=n_cols,
+                env_objects=ENVIRONMENT_OBJECTS,
+                inv_objects=INVENTORY_OBJECTS,
+                fps=24,
+            )
+        elif self.render_mode == "rgb_array" and self.render_backend == "numpy":
+            return NumpyRenderer(
+                n_rows=n_rows,
+                n_cols=n_cols,
+                env_objects=ENVIRONMENT_OBJECTS,
+                inv_objects=INVENTORY_OBJECTS,
+            )
+        elif self.render_mode == "rgb_array":
+            return RgbRenderer(
+                n_rows=n_rows,
+                n_cols=n_cols,
+                env_objects=ENVIRONMENT_OBJECTS,
+                inv_objects=INVENTORY_OBJECTS,
+            )
+
+    @property
+    def grid(self):
+        """One-hot view of the grid with shape (n_rows, n_cols, n_env_objects).
+
+        The view is built from the cell codes on each access, writes to it are not
+        reflected in the environment.
+        """
+        grid = ONE_HOT_CELLS[self.cells]
+        grid.flags.writeable = False
+        return grid
+
+    def _create_observation(self):
+        if self.encoder is not None:
+            # Packed straight from the grid, no observation buffers are filled
+            return self.encoder.encode_parts(
+                self.agent_position,
+                self.observation_engine.window(self.agent_position),
+                self.direction,
+                self.interaction_props,
+            )
+        return self.observation_engine.observe(
+            self.agent_position, self.direction, self.interaction_props
         )
 
     def _sample_position(self):
-        row = np.random.randint(2, self.n_rows - 2)
-        col = np.random.randint(2, self.n_cols - 2)
+        row = self.np_random.integers(2, self.n_rows - 2)
+        col = self.np_random.integers(2, self.n_cols - 2)
         return row, col
 
     def _initialize_environment(self):
@@ -304,16 +773,12 @@ class Craft2dEnv(gym.Env):
                     continue
 
                 used_positions.append((center_row + d_r, center_col + d_c))
-                self.grid[center_row + d_r, center_col + d_c, i] = 1
+                self._write_cell(center_row + d_r, center_col + d_c, i + 1)
                 counter += 1
 
     def _initialize_island(self):
         # Get island position
-        for r, c in product(range(self.n_rows), range(self.n_cols)):
-            if self.grid[r, c, ENVIRONMENT_OBJECTS.index("gem")] == 1:
-                island_row = r
-                island_col = c
-                break
+        island_row, island_col = next(iter(self.objects[GEM]))
 
         # Surround island with water
         for d_r, d_c in product(range(-1, 2), range(-1, 2)):
@@ -321,13 +786,13 @@ class Craft2dEnv(gym.Env):
             n_c = island_col + d_c
 
             if (
-                (n_r == r and n_c == c)
-                or (n_r >= self.n_rows or n_r < 0)
+                (n_r >= self.n_rows or n_r < 0)
                 or (n_c >= self.n_cols or n_c < 0)
+                or self.cells[n_r, n_c] != EMPTY
             ):
                 continue
 
-            self.grid[n_r, n_c, ENVIRONMENT_OBJECTS.index("water")] = 1
+            self._write_cell(n_r, n_c, WATER)
 
     def _update_agent_position(self, action: int):
         self.last_position = self.agent_position
@@ -346,20 +811,15 @@ class Craft2dEnv(gym.Env):
             n_row = row + 1 if row + 1 < self.n_rows else row
             n_col = col
 
-        # Update position if no collision or water
-        if np.max(self.grid[n_row, n_col]) == 0:
-            self.agent_position = (n_row, n_col)
-
-        # Allow agent to cross water if bridge has been placed
-        object_type = np.argmax(self.grid[n_row, n_col])
-        object_name = ENVIRONMENT_OBJECTS[object_type]
-
-        if object_name == "bridge":
+        # Update position if no collision or water, bridges can be crossed
+        if PASSABLE[self.cells[n_row, n_col]]:
             self.agent_position = (n_row, n_col)
 
     def _update_agent_direction(self, action: int):
-        last_direction = self.direction
-        self.direction = np.zeros((4,))
+        if action == INTERACT:
+            return
+
+        self.direction[:] = 0
 
         if action == RIGHT:
             self.direction[0] = 1
@@ -369,113 +829,84 @@ class Craft2dEnv(gym.Env):
             self.direction[2] = 1
         elif action == DOWN:
             self.direction[3] = 1
-        elif action == INTERACT:
-            self.direction = last_direction
+
+    def _compile_task(self):
+        # Task as integers for step: inventory index, -1 without a task object,
+        # and the count to hold
+        self.task_index = (
+            -1 if self.task_object is None else PROPS.index(self.task_object)
+        )
+        self.task_count = TASK_COUNTS.index(self.task_object_count) + 1
+
+    def _all_task_rewards(self, labels: int) -> np.ndarray:
+        # Reward of every task spec, compared against the inventory at once
+        if labels != PRINCESS_LABEL:
+            return np.zeros(len(TASK_SPECS))
+        return (self.inventory[TASK_SPEC_INDICES] == TASK_SPEC_COUNTS).astype(
+            np.float64
+        )
 
     def _handle_interact_action(self):
         # Cell in front of agent
         itr_row, itr_col = self._get_interaction_cell()
 
-        # Test if cell is empty
-        if np.max(self.grid[itr_row, itr_col]) == 0:
-            return
-
-        # Get object type
-        object_type = np.argmax(self.grid[itr_row, itr_col])
-        object_name = ENVIRONMENT_OBJECTS[object_type]
+        cell = self.cells[itr_row, itr_col]
 
-        if object_name == "princess":
+        if cell == PRINCESS:
             if not self.task_set:
                 self.interaction_props = (self.task_object, self.task_object_count)
                 self.task_set = True
             else:
                 self.interaction_props = ("P",)
+            return
         elif self.task_object is None:
             # Cannot interact before task specified
             return
 
-        # Collect resources from environment
-        if object_name == "tree":
-            self._collect_tree(itr_row, itr_col)
-            self.interaction_props = ("WD", "CL")
-        elif object_name == "stone":
-            self._collect_stone(itr_row, itr_col)
-            self.interaction_props = ("STN", "CL")
-        elif object_name == "grass":
-            self._collect_grass(itr_row, itr_col)
-            self.interaction_props = ("GRS", "CL")
-        elif object_name == "gem":
-            self._collect_gem(itr_row, itr_col)
-            self.interaction_props = ("GM", "CL")
-        elif object_name == "water":
-            self._handle_water_interaction(itr_row, itr_col)
-        elif object_name == "crafting-table":
-            self._handle_crafting_interaction()
-
-    def _handle_crafting_interaction(self):
-        if self.inventory[6] > 0 and self.inventory[7] > 0:
-            # Advanced weapon
-            self.inventory[8] += 1
-            self.inventory[6] -= 1
-            self.inventory[7] -= 1
-            self.interaction_props = ("W-ADV", "CL")
-        if self.inventory[3] > 0 and self.inventory[1] >= 2:
-            # Weapon
-            self.inventory[6] += 1
-            self.inventory[3] -= 1
-            self.inventory[1] -= 2
-            self.interaction_props = ("W-BSC", "CL")
-        elif self.inventory[3] > 0 and self.inventory[4] >= 1:
-            # Bridge
-            self.inventory[5] += 1
-            self.inventory[3] -= 1
-            self.inventory[4] -= 1
-            self.interaction_props = ("BRG", "CL")
-        elif self.inventory[0] > 1:
-            # Sticks
-            self.inventory[0] -= 2
-            self.inventory[3] += 1
-            self.interaction_props = ("STKS", "CL")
-        elif self.inventory[2] > 1:
-            # Rope
-            self.inventory[2] -= 2
-            self.inventory[4] += 1
-            self.interaction_props = ("RP", "CL")
+        # Collect resources, craft or place bridge depending on the object
+        handler = self._interaction_handlers[cell]
+        if handler is not None:
+            handler(itr_row, itr_col)
+
+    def _handle_crafting_interaction(self, itr_row=None, itr_col=None):
+        props = self.rules.craft(self.inventory)
+        if props is not None:
+            self.interaction_props = props
 
     def _handle_water_interaction(self, itr_row, itr_col):
         # Place bridge on water if agent has bridge in inventory
-        water_idx_env = ENVIRONMENT_OBJECTS.index("water")
-        bridge_idx_env = ENVIRONMENT_OBJECTS.index("bridge")
-        bridge_idx_inv = INVENTORY_OBJECTS.index("bridge")
-
-        if self.inventory[bridge_idx_inv] > 0:
-            self.grid[itr_row, itr_col, bridge_idx_env] = 1
-            self.grid[itr_row, itr_col, water_idx_env] = 0
-            self.inventory[bridge_idx_inv] -= 1
-
-    def _collect_tree(self, itr_row, itr_col):
-        tree_idx_env = ENVIRONMENT_OBJECTS.index("tree")
-        wood_idx_inv = INVENTORY_OBJECTS.index("wood")
-        self.inventory[wood_idx_inv] += 1
-        self.grid[itr_row, itr_col, tree_idx_env] = 0
-
-    def _collect_stone(self, itr_row, itr_col):
-        stone_idx_env = ENVIRONMENT_OBJECTS.index("stone")
-        stone_idx_inv = INVENTORY_OBJECTS.index("stone")
-        self.inventory[stone_idx_inv] += 1
-        self.grid[itr_row, itr_col, stone_idx_env] = 0
-
-    def _collect_grass(self, itr_row, itr_col):
-        grass_idx_env = ENVIRONMENT_OBJECTS.index("grass")
-        grass_idx_inv = INVENTORY_OBJECTS.index("grass")
-        self.inventory[grass_idx_inv] += 1
-        self.grid[itr_row, itr_col, grass_idx_env] = 0
-
-    def _collect_gem(self, itr_row, itr_col):
-        gem_idx_env = ENVIRONMENT_OBJECTS.index("gem")
-        gem_idx_inv = INVENTORY_OBJECTS.index("gem")
-        self.inventory[gem_idx_inv] += 1
-        self.grid[itr_row, itr_col, gem_idx_env] = 0
+        if self.inventory[BRIDGE_INV] > 0:
+            self._set_cell(itr_row, itr_col, BRIDGE)
+            self.inventory[BRIDGE_INV] -= 1
+
+    def _collect_resource(self, itr_row, itr_col):
+        code = self.cells[itr_row, itr_col]
+        self.inventory[self.rules.collect_inventory[code]] += 1
+        self._set_cell(itr_row, itr_col, EMPTY)
+        self.interaction_props = self.rules.collect_props[code]
+
+    def _set_cell(self, row, col, code):
+        self._write_cell(row, col, code)
+        self.cell_changes[(row, col)] = code
+
+    def _write_cell(self, row, col, code):
+        # Every cell write goes through here to keep the object index in sync
+        self._track_cell(row, col, self.cells[row, col], code)
+        self.cells[row, col] = code
+
+    def _track_cell(self, row, col, old_code, code):
+        self.objects.move(row, col, old_code, code)
+        if self._distance_fields is not None:
+            self._distance_fields.cell_changed(row, col)
+
+    def _load_layout(self, cells: np.ndarray):
+        self.cached_cells = cells
+        np.copyto(self.cells, cells)
+        self.cached_objects = ObjectIndex(self.n_env_objects + 1)
+        self.cached_objects.build(cells)
+        self.objects = self.cached_objects.copy()
+        if self._distance_fields is not None:
+            self._distance_fields.load_layout(cells)
 
     def _get_interaction_cell(self):
         interaction_row = self.agent_position[0]
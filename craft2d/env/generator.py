@@ -0,0 +1,311 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from craft2d.config import COLLECTIBLES, RECIPES
+from craft2d.env.environment import (
+    CRAFTING_TABLE,
+    EMPTY,
+    ENVIRONMENT_OBJECTS,
+    GEM,
+    GRASS,
+    INVENTORY_OBJECTS,
+    PRINCESS,
+    RESOURCE_COUNTS,
+    STONE,
+    TREE,
+    WATER,
+)
+
+# Cells the agent can walk through once the resources on them are collected
+CLEARABLE = np.zeros(len(ENVIRONMENT_OBJECTS) + 1, dtype=bool)
+CLEARABLE[[EMPTY, TREE, STONE, GRASS]] = True
+CLUSTERS = ((TREE, "tree"), (STONE, "stone"), (GRASS, "grass"))
+
+
+def _collected_objects(product, recipes=RECIPES, collectibles=COLLECTIBLES):
+    """Environment objects collected to make one product, by object name."""
+    for collectible in collectibles:
+        if collectible.inventory_object == product:
+            return {collectible.env_object: 1}
+
+    counts = {}
+    recipe = next(r for stage in recipes for r in stage if r.product == product)
+    for ingredient, count in recipe.ingredients.items():
+        collected = _collected_objects(ingredient, recipes, collectibles)
+        for name, needed in collected.items():
+            counts[name] = counts.get(name, 0) + count * needed
+    return counts
+
+
+def _task_resource_counts():
+    # Every task at count M1, tasks that collect the gem also craft the bridge
+    # to its island
+    counts = {name: 0 for _, name in CLUSTERS}
+    for product in INVENTORY_OBJECTS:
+        needed = _collected_objects(product)
+        if "gem" in needed:
+            for name, count in _collected_objects("bridge").items():
+                needed[name] = needed.get(name, 0) + count
+        for name in counts:
+            counts[name] = max(counts[name], needed.get(name, 0))
+    return counts
+
+
+# Cells of every resource cluster the most demanding task needs at count M1
+MIN_RESOURCE_COUNTS = _task_resource_counts()
+
+
+class WorldGenerator:
+    """Seeded procedural layouts for Craft2dEnv on maps of any size.
+
+    Trees, stones and grass grow as random clusters, the princess and crafting
+    table are single cells and the gem sits on an island surrounded by water.
+    Layouts are rejected and regenerated until every object can be reached from
+    the agent start position at (0, 0). Layouts are built in batches with array
+    operations, so generating many at once is far cheaper per layout.
+
+    Args:
+        n_rows: Number of rows in the map.
+        n_cols: Number of columns in the map.
+        resource_counts: Cells per resource cluster by object name. Defaults to
+            RESOURCE_COUNTS, scaled down on maps smaller than 12x12 but never
+            below MIN_RESOURCE_COUNTS.
+        max_attempts: Batches tried by generate before giving up.
+    """
+
+    def __init__(
+        self,
+        n_rows: int,
+        n_cols: int,
+        resource_counts: dict[str, int] = None,
+        max_attempts: int = 100,
+    ):
+        self.n_rows = n_rows
+        self.n_cols = n_cols
+        self.max_attempts = max_attempts
+
+        if resource_counts is None:
+            per_cluster = max(1, n_rows * n_cols // 12)
+            resource_counts = {
+                name: max(
+                    MIN_RESOURCE_COUNTS[name], min(RESOURCE_COUNTS[name], per_cluster)
+                )
+                for _, name in CLUSTERS
+            }
+        for name, count in MIN_RESOURCE_COUNTS.items():
+            if resource_counts[name] < count:
+                raise ValueError(
+                    f"Every task needs {count} {name} cells, resource_counts has "
+                    f"{resource_counts[name]}."
+                )
+        self.resource_counts = resource_counts
+
+        # Cells that may hold objects, the start position stays empty
+        self._available = np.ones((n_rows, n_cols), dtype=bool)
+        self._available[0, 0] = False
+        # The gem island is kept away from the start position
+        rows, cols = np.indices((n_rows, n_cols))
+        self._island_cells = np.maximum(rows, cols) >= 2
+
+    def generate(self, rng: np.random.Generator, size: int = None) -> np.ndarray:
+        """Layout of cell codes with shape (n_rows, n_cols), drawn from rng.
+
+        With size set, size layouts are stacked along the first axis.
+        """
+        n_layouts = 1 if size is None else size
+        layouts = np.empty((n_layouts, self.n_rows, self.n_cols), dtype=np.int8)
+        filled = 0
+
+        for _ in range(self.max_attempts):
+            cells, valid = self._sample_layouts(rng, n_layouts - filled)
+            cells = cells[valid & self.is_solvable(cells)]
+            layouts[filled : filled + len(cells)] = cells
+            filled += len(cells)
+            if filled == n_layouts:
+                return layouts[0] if size is None else layouts
+
+        raise ValueError(
+            f"No solvable layout found for a {self.n_rows}x{self.n_cols} map "
+            f"in {self.max_attempts} attempts."
+        )
+
+    def is_solvable(self, cells: np.ndarray) -> np.ndarray:
+        """Whether every task can be completed by an agent starting at (0, 0).
+
+        Every object must be reachable and there must be at least
+        MIN_RESOURCE_COUNTS of every resource. Trees, stones and grass are
+        cleared once collected, so the agent can walk through them. The gem is
+        reachable when a bridge can be placed on the water next to it. Takes one
+        layout or a stack of layouts.
+        """
+        if cells.ndim == 2:
+            return self.is_solvable(cells[None])[0]
+
+        # Flood fill from the start position until no new cells are reached
+        clearable = CLEARABLE[cells]
+        reached = np.zeros_like(clearable)
+        reached[:, 0, 0] = clearable[:, 0, 0]
+        while True:
+            grown = (reached | _neighbours(reached)) & clearable
+            if np.array_equal(grown, reached):
+                break
+            reached = grown
+
+        # Cells next to a reached cell can be interacted with
+        reachable = _neighbours(reached)
+        resources = np.isin(cells, (TREE, STONE, GRASS))
+        bridge_cells = _neighbours(cells == GEM) & (cells == WATER)
+        enough = np.ones(len(cells), dtype=bool)
+        for code, name in CLUSTERS:
+            enough &= (cells == code).sum(axis=(1, 2)) >= MIN_RESOURCE_COUNTS[name]
+        return (
+            enough
+            & (reachable & (cells == PRINCESS)).any(axis=(1, 2))
+            & (reachable & (cells == CRAFTING_TABLE)).any(axis=(1, 2))
+            & ~(resources & ~reached).any(axis=(1, 2))
+            & (reachable & bridge_cells).any(axis=(1, 2))
+        )
+
+    def fill(
+        self,
+        path: str,
+        start: int,
+        stop: int,
+        seed_seq: np.random.SeedSequence,
+        batch_size: int = 1024,
+    ):
+        """Generate layouts start to stop of the .npy file at path."""
+        layouts = np.load(path, mmap_mode="r+")
+        rng = np.random.default_rng(seed_seq)
+        for batch_start in range(start, stop, batch_size):
+            batch_stop = min(batch_start + batch_size, stop)
+            layouts[batch_start:batch_stop] = self.generate(
+                rng, batch_stop - batch_start
+            )
+        layouts.flush()
+
+    def _sample_layouts(self, rng, n_layouts):
+        cells = np.zeros((n_layouts, self.n_rows, self.n_cols), dtype=np.int8)
+        valid = np.ones(n_layouts, dtype=bool)
+
+        gem = self._place(cells, GEM, self._island_cells, valid, rng)
+        island = (gem | _neighbours(gem, diagonal=True)) & (cells == EMPTY)
+        cells[island & self._available] = WATER
+
+        for code in (PRINCESS, CRAFTING_TABLE):
+            self._place(cells, code, None, valid, rng)
+
+        for code, name in CLUSTERS:
+            cluster = np.zeros(cells.shape, dtype=bool)
+            for _ in range(self.resource_counts[name]):
+                # Grow into empty neighbours, or start a new part of the cluster
+                # when it has none
+                frontier = _neighbours(cluster) & (cells == EMPTY)
+                enclosed = ~frontier.any(axis=(1, 2))
+                frontier[enclosed] = True
+                cluster |= self._place(cells, code, frontier, valid, rng)
+        return cells, valid
+
+    def _place(self, cells, code, candidates, valid, rng):
+        """Write code into one random empty candidate cell of every layout.
+
+        Layouts without a free candidate are marked invalid in valid, returns the
+        mask of placed cells.
+        """
+        free = (cells == EMPTY) & self._available
+        if candidates is not None:
+            free &= candidates
+
+        # Random keys on the free cells, the largest key picks the cell
+        keys = rng.random(cells.shape)
+        keys[~free] = -1
+        flat_keys = keys.reshape(len(cells), -1)
+        choice = flat_keys.argmax(axis=1)
+        valid &= flat_keys[np.arange(len(cells)), choice] >= 0
+
+        placed = np.zeros(cells.shape, dtype=bool)
+        placed.reshape(len(cells), -1)[np.arange(len(cells)), choice] = True
+        placed &= free
+        cells[placed] = code
+        return placed
+
+
+def _neighbours(mask, diagonal=False):
+    """Cells next to a True cell in a stack of masks, excluding the cell itself."""
+    out = np.zeros_like(mask)
+    out[:, 1:] |= mask[:, :-1]
+    out[:, :-1] |= mask[:, 1:]
+    out[:, :, 1:] |= mask[:, :, :-1]
+    out[:, :, :-1] |= mask[:, :, 1:]
+    if diagonal:
+        out[:, 1:, 1:] |= mask[:, :-1, :-1]
+        out[:, 1:, :-1] |= mask[:, :-1, 1:]
+        out[:, :-1, 1:] |= mask[:, 1:, :-1]
+        out[:, :-1, :-1] |= mask[:, 1:, 1:]
+    return out
+
+
+class LayoutBank:
+    """Pregenerated layouts in a .npy file, memory-mapped on load.
+
+    Drawing a layout reads one (n_rows, n_cols) slice of the file, so resets cost
+    the same for any number of layouts. Build banks with LayoutBank.create.
+
+    Args:
+        path: Path of a bank written by LayoutBank.create.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.layouts = np.load(path, mmap_mode="r")
+        _, self.n_rows, self.n_cols = self.layouts.shape
+
+    def __len__(self):
+        return len(self.layouts)
+
+    def __getitem__(self, index):
+        return self.layouts[index]
+
+    def sample(self, rng: np.random.Generator, size: int = None) -> np.ndarray:
+        """Layout drawn uniformly from the bank, or size layouts stacked."""
+        return self.layouts[rng.integers(len(self.layouts), size=size)]
+
+    @classmethod
+    def create(
+        cls,
+        path: str,
+        n_layouts: int,
+        n_rows: int,
+        n_cols: int,
+        seed: int = None,
+        num_workers: int = 1,
+        chunk_size: int = 10000,
+        **generator_kwargs,
+    ) -> "LayoutBank":
+        """Generate n_layouts layouts into the file at path.
+
+        Chunks of chunk_size layouts are generated from their own seed spawned
+        from seed, so a bank only depends on the seed and chunk_size and not on
+        num_workers.
+        """
+        layouts = np.lib.format.open_memmap(
+            path, mode="w+", dtype=np.int8, shape=(n_layouts, n_rows, n_cols)
+        )
+        del layouts
+
+        starts = range(0, n_layouts, chunk_size)
+        seeds = np.random.SeedSequence(seed).spawn(len(starts))
+        chunks = [
+            (path, start, min(start + chunk_size, n_layouts), seed_seq)
+            for start, seed_seq in zip(starts, seeds)
+        ]
+        generator = WorldGenerator(n_rows, n_cols, **generator_kwargs)
+
+        if num_workers > 1:
+            with ProcessPoolExecutor(num_workers) as executor:
+                list(executor.map(generator.fill, *zip(*chunks)))
+        else:
+            for chunk in chunks:
+                generator.fill(*chunk)
+        return cls(path)
@@ -0,0 +1,266 @@
+from functools import partial
+from types import FunctionType
+from typing import NamedTuple
+
+import numpy as np
+
+from craft2d.env.crafting import CraftingRules
+from craft2d.env.environment import (
+    BRIDGE,
+    BRIDGE_INV,
+    CRAFTING_TABLE,
+    EMPTY,
+    INTERACT,
+    PASSABLE,
+    PRINCESS,
+    WATER,
+)
+from craft2d.env.vector import (
+    DIRECTION_OFFSETS,
+    INTERACTION_PROPS,
+    NO_PROPS,
+    PRINCESS_PROPS,
+    TASK_SET,
+    _interaction_code,
+)
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+HAS_NUMBA = njit is not None
+
+
+class KernelTables(NamedTuple):
+    """Crafting rules and interaction codes as arrays the kernels index.
+
+    collect_inventory and collect_interactions are indexed by cell code, -1 and
+    NO_PROPS where the cell is not collectible. Recipes of stage s are
+    stage_starts[s] to stage_starts[s + 1].
+    """
+
+    passable: np.ndarray
+    collect_inventory: np.ndarray
+    collect_interactions: np.ndarray
+    requirements: np.ndarray
+    deltas: np.ndarray
+    stage_starts: np.ndarray
+    recipe_interactions: np.ndarray
+
+
+def build_tables(rules: CraftingRules) -> KernelTables:
+    n_codes = len(rules.collect_inventory)
+    collect_inventory = np.full(n_codes, -1, dtype=np.int64)
+    collect_interactions = np.full(n_codes, NO_PROPS, dtype=np.int64)
+    for code in rules.collectible_codes:
+        collect_inventory[code] = rules.collect_inventory[code]
+        collect_interactions[code] = _interaction_code(rules.collect_props[code])
+
+    stage_starts = [0]
+    for indices, _, _ in rules.stages:
+        stage_starts.append(stage_starts[-1] + len(indices))
+    return KernelTables(
+        passable=PASSABLE.copy(),
+        collect_inventory=collect_inventory,
+        collect_interactions=collect_interactions,
+        requirements=rules.requirements.copy(),
+        deltas=rules.deltas.copy(),
+        stage_starts=np.array(stage_starts, dtype=np.int64),
+        recipe_interactions=np.array(
+            [_interaction_code(props) for props in rules.recipe_props], dtype=np.int64
+        ),
+    )
+
+
+def step_world(
+    cells,
+    inventory,
+    row,
+    col,
+    direction,
+    action,
+    task_object,
+    task_set,
+    passable,
+    collect_inventory,
+    collect_interactions,
+    requirements,
+    deltas,
+    stage_starts,
+    recipe_interactions,
+):
+    """Transition of one world, the grid and inventory are updated in place.
+
+    direction is an index into DIRECTION_OFFSETS, the last entry before the
+    first move. Returns (row, col, direction, interaction code, task_set,
+    changed row, changed col, old code of the changed cell), the changed row is
+    -1 when no cell changed.
+    """
+    n_rows, n_cols = cells.shape
+    interaction = NO_PROPS
+    changed_row = -1
+    changed_col = -1
+    old_code = EMPTY
+
+    if action != INTERACT:
+        # Move unless the target is blocked, then face the direction of the move
+        n_row = min(max(row + DIRECTION_OFFSETS[action, 0], 0), n_rows - 1)
+        n_col = min(max(col + DIRECTION_OFFSETS[action, 1], 0), n_cols - 1)
+        if passable[cells[n_row, n_col]]:
+            row = n_row
+            col = n_col
+        return (row, col, action, interaction, task_set, -1, -1, EMPTY)
+
+    # Cell in front of agent
+    itr_row = min(max(row + DIRECTION_OFFSETS[direction, 0], 0), n_rows - 1)
+    itr_col = min(max(col + DIRECTION_OFFSETS[direction, 1], 0), n_cols - 1)
+    target = cells[itr_row, itr_col]
+
+    if target == PRINCESS:
+        interaction = PRINCESS_PROPS if task_set else TASK_SET
+        return (row, col, direction, interaction, True, -1, -1, EMPTY)
+    if task_object < 0:
+        # Cannot interact before task specified
+        return (row, col, direction, interaction, task_set, -1, -1, EMPTY)
+
+    if collect_inventory[target] >= 0:
+        inventory[collect_inventory[target]] += 1
+        cells[itr_row, itr_col] = EMPTY
+        interaction = collect_interactions[target]
+        changed_row, changed_col, old_code = itr_row, itr_col, int(target)
+    elif target == WATER:
+        # Place bridge on water if agent has bridge in inventory
+        if inventory[BRIDGE_INV] > 0:
+            cells[itr_row, itr_col] = BRIDGE
+            inventory[BRIDGE_INV] -= 1
+            changed_row, changed_col, old_code = itr_row, itr_col, int(target)
+    elif target == CRAFTING_TABLE:
+        # First recipe of every stage with its requirements met is crafted
+        for stage in range(len(stage_starts) - 1):
+            for recipe in range(stage_starts[stage], stage_starts[stage + 1]):
+                possible = True
+                for idx in range(len(inventory)):
+                    if inventory[idx] < requirements[recipe, idx]:
+                        possible = False
+                        break
+                if possible:
+                    for idx in range(len(inventory)):
+                        inventory[idx] += deltas[recipe, idx]
+                    interaction = recipe_interactions[recipe]
+                    break
+    return (
+        row,
+        col,
+        direction,
+        interaction,
+        task_set,
+        changed_row,
+        changed_col,
+        old_code,
+    )
+
+
+def step_batch(
+    grids,
+    inventories,
+    positions,
+    directions,
+    actions,
+    task_objects,
+    task_set,
+    interactions,
+    passable,
+    collect_inventory,
+    collect_interactions,
+    requirements,
+    deltas,
+    stage_starts,
+    recipe_interactions,
+):
+    """Transition of N worlds, every array is updated in place."""
+    for env_idx in range(len(grids)):
+        row, col, direction, interaction, env_task_set, _, _, _ = step_world(
+            grids[env_idx],
+            inventories[env_idx],
+            positions[env_idx, 0],
+            positions[env_idx, 1],
+            directions[env_idx],
+            actions[env_idx],
+            task_objects[env_idx],
+            task_set[env_idx],
+            passable,
+            collect_inventory,
+            collect_interactions,
+            requirements,
+            deltas,
+            stage_starts,
+            recipe_interactions,
+        )
+        positions[env_idx, 0] = row
+        positions[env_idx, 1] = col
+        directions[env_idx] = direction
+        interactions[env_idx] = interaction
+        task_set[env_idx] = env_task_set
+
+
+def bind_step(tables: KernelTables, compiled: bool = HAS_NUMBA):
+    """step_world with the tables bound, called with the world state only.
+
+    Compiled steps are built once per set of tables. numba freezes the bound
+    tables into the compiled code, so they are not converted on every call.
+    """
+    if not compiled:
+        return partial(step_world_py, **tables._asdict())
+
+    (
+        passable,
+        collect_inventory,
+        collect_interactions,
+        requirements,
+        deltas,
+        stage_starts,
+        recipe_interactions,
+    ) = tables
+
+    def step(cells, inventory, row, col, direction, action, task_object, task_set):
+        return step_world(
+            cells,
+            inventory,
+            row,
+            col,
+            direction,
+            action,
+            task_object,
+            task_set,
+            passable,
+            collect_inventory,
+            collect_interactions,
+            requirements,
+            deltas,
+            stage_starts,
+            recipe_interactions,
+        )
+
+    key = tuple((table.shape, table.tobytes()) for table in tables)
+    if key not in _BOUND_STEPS:
+        _BOUND_STEPS[key] = njit(nogil=True)(step)
+    return _BOUND_STEPS[key]
+
+
+# Compiled steps of bind_step by the shapes and bytes of their tables
+_BOUND_STEPS = {}
+# Uncompiled kernels of backend="kernels-py", copied under their own names so
+# they pickle and step_batch_py keeps calling step_world_py once the originals
+# are compiled
+step_world_py = FunctionType(step_world.__code__, globals(), "step_world_py")
+step_batch_py = FunctionType(
+    step_batch.__code__, {**globals(), "step_world": step_world_py}, "step_batch_py"
+)
+step_world_py.__qualname__ = "step_world_py"
+step_batch_py.__qualname__ = "step_batch_py"
+
+if HAS_NUMBA:
+    # step_batch calls the compiled step_world, which must be bound first
+    step_world = njit(cache=True, nogil=True)(step_world)
+    step_batch = njit(cache=True, nogil=True)(step_batch)
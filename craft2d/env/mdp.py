@@ -0,0 +1,178 @@
+from typing import NamedTuple
+
+import numpy as np
+
+from craft2d.env.environment import PROPS, TASKS, Craft2dEnv, Craft2dState
+
+
+class TabularMDP(NamedTuple):
+    """Reachable state space of a Craft2dEnv compiled into sparse arrays.
+
+    Transitions are a CSR matrix with one row per state and action pair, row
+    state * n_actions + action holds the next state ids in indices and their
+    probabilities in probabilities. States that completed the task are absorbing
+    with zero reward.
+    """
+
+    states: list
+    n_actions: int
+    indptr: np.ndarray
+    indices: np.ndarray
+    probabilities: np.ndarray
+    rewards: np.ndarray
+    terminal: np.ndarray
+
+    @property
+    def n_states(self):
+        return len(self.states)
+
+
+def state_key(state: Craft2dState) -> tuple:
+    """Hashable key of the parts of a state that affect future transitions."""
+    return (
+        frozenset(state.cell_changes),
+        tuple(state.inventory),
+        state.agent_position,
+        tuple(state.direction),
+        state.task_set,
+        state.task_completed,
+    )
+
+
+def compile_mdp(env: Craft2dEnv, max_states: int = 1_000_000) -> TabularMDP:
+    """Enumerate the states reachable from the current state of env.
+
+    States are found by breadth first search over Craft2dEnv.step, restoring
+    each state with set_state before stepping it. State 0 is the current state,
+    the environment is left in an arbitrary state afterwards. Raises ValueError
+    when more than max_states states are reachable.
+    """
+    n_actions = env.action_space.n
+    states = [env.get_state()]
+    state_ids = {state_key(states[0]): 0}
+    next_states = []
+    rewards = []
+
+    index = 0
+    while index < len(states):
+        state = states[index]
+        index += 1
+
+        if state.task_completed:
+            next_states.append([index - 1] * n_actions)
+            rewards.append([0] * n_actions)
+            continue
+
+        state_next = []
+        state_rewards = []
+        for action in range(n_actions):
+            env.set_state(state)
+            _, reward, _, _, _ = env.step(action)
+
+            next_state = env.get_state()
+            key = state_key(next_state)
+            next_id = state_ids.get(key)
+            if next_id is None:
+                if len(states) == max_states:
+                    raise ValueError(
+                        f"More than {max_states} reachable states, increase "
+                        "max_states or use a smaller map."
+                    )
+                next_id = len(states)
+                state_ids[key] = next_id
+                states.append(next_state)
+
+            state_next.append(next_id)
+            state_rewards.append(reward)
+        next_states.append(state_next)
+        rewards.append(state_rewards)
+
+    # Dynamics are deterministic, every row of the CSR matrix has one entry
+    indices = np.array(next_states, dtype=np.int64).ravel()
+    return TabularMDP(
+        states=states,
+        n_actions=n_actions,
+        indptr=np.arange(len(indices) + 1, dtype=np.int64),
+        indices=indices,
+        probabilities=np.ones(len(indices)),
+        rewards=np.array(rewards, dtype=np.float64),
+        terminal=np.array([state.task_completed for state in states]),
+    )
+
+
+def q_values(mdp: TabularMDP, values: np.ndarray, gamma: float) -> np.ndarray:
+    """Action values with shape (n_states, n_actions) for the state values."""
+    # Rows of the CSR matrix are never empty, so reduceat sums each row
+    expected = np.add.reduceat(mdp.probabilities * values[mdp.indices], mdp.indptr[:-1])
+    return mdp.rewards + gamma * expected.reshape(mdp.n_states, mdp.n_actions)
+
+
+def value_iteration(
+    mdp: TabularMDP,
+    gamma: float = 0.99,
+    tolerance: float = 1e-8,
+    max_iterations: int = 100_000,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Optimal state values and a greedy policy, returns (values, policy)."""
+    values = np.zeros(mdp.n_states)
+    for _ in range(max_iterations):
+        q = q_values(mdp, values, gamma)
+        new_values = q.max(axis=1)
+        converged = np.abs(new_values - values).max() < tolerance
+        values = new_values
+        if converged:
+            break
+    return values, q_values(mdp, values, gamma).argmax(axis=1)
+
+
+def evaluate_policy(
+    mdp: TabularMDP,
+    policy: np.ndarray,
+    gamma: float = 0.99,
+    tolerance: float = 1e-8,
+    max_iterations: int = 100_000,
+) -> np.ndarray:
+    """State values of a policy.
+
+    The policy is an action per state with shape (n_states,), or action
+    probabilities per state with shape (n_states, n_actions).
+    """
+    if policy.ndim == 1:
+        policy = np.eye(mdp.n_actions)[policy]
+
+    values = np.zeros(mdp.n_states)
+    for _ in range(max_iterations):
+        new_values = (policy * q_values(mdp, values, gamma)).sum(axis=1)
+        converged = np.abs(new_values - values).max() < tolerance
+        values = new_values
+        if converged:
+            break
+    return values
+
+
+def optimal_returns(
+    env: Craft2dEnv,
+    tasks: dict[str, int] = TASKS,
+    task_object_count: str = "M1",
+    gamma: float = 0.99,
+    seed: int = None,
+    max_states: int = 1_000_000,
+) -> dict[str, float]:
+    """Optimal discounted return from the reset state for each task by name.
+
+    env is reset once with seed and every task is compiled from that state, so
+    environments drawing random layouts are solved on the same layout for all
+    tasks.
+    """
+    env.reset(seed=seed)
+    start = env.get_state()
+    returns = {}
+    for name, task_idx in tasks.items():
+        env.set_state(
+            start._replace(
+                task_object=PROPS[task_idx], task_object_count=task_object_count
+            )
+        )
+        values, _ = value_iteration(compile_mdp(env, max_states), gamma)
+        returns[name] = float(values[0])
+    return returns
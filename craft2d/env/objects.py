@@ -0,0 +1,45 @@
+import numpy as np
+
+
+class ObjectIndex:
+    """Positions of the objects on a grid, one set of (row, col) per cell code.
+
+    The index is kept in sync by passing every cell write to move, so finding
+    objects costs the number of objects rather than a scan of the grid. EMPTY
+    cells (code 0) are not indexed.
+
+    Args:
+        n_codes: Number of cell codes, EMPTY included.
+    """
+
+    def __init__(self, n_codes: int):
+        self.positions = [set() for _ in range(n_codes)]
+
+    def build(self, cells: np.ndarray):
+        """Index every object of cells, replacing the current contents."""
+        for positions in self.positions:
+            positions.clear()
+        rows, cols = np.nonzero(cells)
+        for row, col, code in zip(
+            rows.tolist(), cols.tolist(), cells[rows, cols].tolist()
+        ):
+            self.positions[code].add((row, col))
+
+    def copy(self) -> "ObjectIndex":
+        index = ObjectIndex(0)
+        index.positions = [set(positions) for positions in self.positions]
+        return index
+
+    def move(self, row: int, col: int, old_code: int, new_code: int):
+        """Record that cell (row, col) changed from old_code to new_code."""
+        if old_code:
+            self.positions[old_code].discard((row, col))
+        if new_code:
+            self.positions[new_code].add((row, col))
+
+    def __getitem__(self, code: int) -> set:
+        """Positions of the objects with cell code, do not modify the set."""
+        return self.positions[code]
+
+    def count(self, code: int) -> int:
+        return len(self.positions[code])
@@ -0,0 +1,111 @@
+import numpy as np
+
+OUT_OF_BOUNDS = -1
+
+
+def viewport_origin(agent_position, viewport, n_rows, n_cols):
+    """Top left cell of a viewport centred on the agent, kept inside the map.
+
+    Works on one (row, col) position or positions with shape (N, 2).
+    """
+    rows, cols = viewport
+    origin_row = np.clip(agent_position[..., 0] - rows // 2, 0, max(n_rows - rows, 0))
+    origin_col = np.clip(agent_position[..., 1] - cols // 2, 0, max(n_cols - cols, 0))
+    return origin_row, origin_col
+
+
+class ObservationEngine:
+    """Egocentric observations sliced from a padded copy of the grid.
+
+    The engine owns the grid storage. Cells outside the map hold OUT_OF_BOUNDS, so
+    the window around the agent is a plain slice that never needs bounds checks.
+    Observations are written into preallocated buffers, by default copies of the
+    buffers are returned. With readonly_views=True the buffers are returned as
+    read-only views that are overwritten by the next call to observe.
+
+    Args:
+        n_rows: Number of rows in the grid.
+        n_cols: Number of columns in the grid.
+        view_radius: Cells visible on each side of the agent, 1 gives a 3x3
+            window. None observes the full map.
+        readonly_views: Return read-only views of the buffers instead of copies.
+    """
+
+    def __init__(
+        self,
+        n_rows: int,
+        n_cols: int,
+        view_radius: int = 1,
+        readonly_views: bool = False,
+    ):
+        self.n_rows = n_rows
+        self.n_cols = n_cols
+        self.view_radius = view_radius
+        self.readonly_views = readonly_views
+
+        pad = 0 if view_radius is None else view_radius
+        self.padded_cells = np.full(
+            (n_rows + 2 * pad, n_cols + 2 * pad), OUT_OF_BOUNDS, dtype=np.int8
+        )
+
+        if view_radius is None:
+            window_shape = (n_rows, n_cols)
+        else:
+            window_shape = (2 * view_radius + 1, 2 * view_radius + 1)
+
+        self.position = np.zeros((2,), dtype=np.int64)
+        self.grid = np.zeros(window_shape, dtype=np.int64)
+        self.direction = np.zeros((4,))
+
+        self._bind_views()
+
+    def __getstate__(self):
+        # Views are rebuilt on the copied buffers, copying them would detach them
+        state = self.__dict__.copy()
+        del state["cells"], state["_views"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._bind_views()
+
+    def observe(self, agent_position, direction, interaction_props):
+        row, col = agent_position
+        self.position[0] = row
+        self.position[1] = col
+
+        np.copyto(self.grid, self.window(agent_position))
+
+        np.copyto(self.direction, direction)
+
+        if self.readonly_views:
+            position, grid, direction = self._views
+        else:
+            position = self.position.copy()
+            grid = self.grid.copy()
+            direction = self.direction.copy()
+        return position, grid, direction, interaction_props
+
+    def window(self, agent_position):
+        """View of the cells visible from agent_position, valid until they change."""
+        if self.view_radius is None:
+            return self.cells
+
+        # Padding offsets the window so it starts at the agent position
+        row, col = agent_position
+        size = 2 * self.view_radius + 1
+        return self.padded_cells[row : row + size, col : col + size]
+
+    def _bind_views(self):
+        pad = 0 if self.view_radius is None else self.view_radius
+        self.cells = self.padded_cells[pad : pad + self.n_rows, pad : pad + self.n_cols]
+        self._views = tuple(
+            self._readonly(buffer)
+            for buffer in (self.position, self.grid, self.direction)
+        )
+
+    @staticmethod
+    def _readonly(buffer):
+        view = buffer.view()
+        view.flags.writeable = False
+        return view
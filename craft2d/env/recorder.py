@@ -0,0 +1,454 @@
+import json
+import os
+import queue
+import threading
+
+import gymnasium as gym
+import numpy as np
+
+from craft2d.config import Collectible, Recipe
+from craft2d.env.encoding import DIRECTION_INDICES, PROPS_CODES
+from craft2d.env.environment import PROPS, TASK_COUNTS, Craft2dEnv
+from craft2d.env.generator import WorldGenerator
+
+# Row shapes are filled in with the observation window shape
+STEP_COLUMNS = {
+    "episode": (np.int32, ()),
+    "position": (np.int16, (2,)),
+    "grid": (np.int8, "window"),
+    "direction": (np.int8, ()),
+    "props": (np.int8, ()),
+    "action": (np.int8, ()),
+    "reward": (np.float32, ()),
+    "done": (np.bool_, ()),
+}
+EPISODE_COLUMNS = {
+    "start": (np.int64, ()),
+    "length": (np.int64, ()),
+    "seed": (np.int64, ()),
+    "task_object": (np.int8, ()),
+    "task_object_count": (np.int8, ()),
+    "final_position": (np.int16, (2,)),
+    "final_grid": (np.int8, "window"),
+    "final_direction": (np.int8, ()),
+    "final_props": (np.int8, ()),
+}
+# Seed of episodes reset without one in older recordings
+NO_SEED = -1
+
+
+class ColumnStore:
+    """Growable columns of fixed-shape rows in memory-mapped files.
+
+    Every column is a raw file named after it in directory, its dtype, row shape
+    and the number of rows are stored in {name}.json. Files grow by doubling, so
+    appending costs amortised O(1) per row.
+
+    Args:
+        directory: Directory of the column files.
+        name: Name of the table, used for the metadata file.
+        columns: Dtype and row shape by column name.
+        capacity: Rows allocated up front.
+    """
+
+    def __init__(self, directory: str, name: str, columns: dict, capacity: int):
+        self.directory = directory
+        self.name = name
+        self.columns = {
+            column: (np.dtype(dtype), tuple(shape))
+            for column, (dtype, shape) in columns.items()
+        }
+        self.length = 0
+        self.capacity = 0
+        self.arrays = {}
+        self._grow(max(capacity, 1))
+
+    def append(self, rows: dict):
+        """Append arrays of rows, one array per column."""
+        n_rows = len(next(iter(rows.values())))
+        if self.length + n_rows > self.capacity:
+            self._grow(max(2 * self.capacity, self.length + n_rows))
+
+        for column, values in rows.items():
+            self.arrays[column][self.length : self.length + n_rows] = values
+        self.length += n_rows
+
+    def flush(self):
+        """Write the rows to disk, then the metadata that makes them visible."""
+        for array in self.arrays.values():
+            array.flush()
+
+        metadata = {
+            "length": self.length,
+            "columns": {
+                column: {"dtype": dtype.str, "shape": list(shape)}
+                for column, (dtype, shape) in self.columns.items()
+            },
+        }
+        path = os.path.join(self.directory, f"{self.name}.json")
+        with open(path + ".tmp", "w") as file:
+            json.dump(metadata, file)
+        os.replace(path + ".tmp", path)
+
+    def _grow(self, capacity):
+        for column, (dtype, shape) in self.columns.items():
+            path = os.path.join(self.directory, f"{column}.bin")
+            if column in self.arrays:
+                self.arrays[column].flush()
+                del self.arrays[column]
+
+            with open(path, "ab") as file:
+                file.truncate(capacity * dtype.itemsize * int(np.prod(shape)))
+            self.arrays[column] = np.memmap(
+                path, dtype=dtype, mode="r+", shape=(capacity, *shape)
+            )
+        self.capacity = capacity
+
+    @staticmethod
+    def load(directory: str, name: str) -> dict:
+        """Read-only memory-mapped columns of a table written by a ColumnStore."""
+        with open(os.path.join(directory, f"{name}.json")) as file:
+            metadata = json.load(file)
+
+        arrays = {}
+        for column, spec in metadata["columns"].items():
+            shape = (metadata["length"], *spec["shape"])
+            if metadata["length"] == 0:
+                arrays[column] = np.zeros(shape, dtype=spec["dtype"])
+                continue
+            arrays[column] = np.memmap(
+                os.path.join(directory, f"{column}.bin"),
+                dtype=spec["dtype"],
+                mode="r",
+                shape=shape,
+            )
+        return arrays
+
+
+class TrajectoryRecorder(gym.Wrapper):
+    """Records every transition of a Craft2dEnv into memory-mapped columns.
+
+    Steps store the observation the action was taken in as position, grid cells,
+    direction index and props code (see ObservationEncoder), with the action,
+    reward of the task passed to reset and done. Episodes store their first
+    step, length, reset seed, task and final observation. Transitions are
+    collected in lists and handed to a background thread every chunk_size steps,
+    which writes and flushes them, so stepping never waits on disk.
+
+    Episodes are replayed from their seed, resets without one draw a seed from
+    the random generator of the environment. The crafting rules, reward mode,
+    viewport and the arguments of a WorldGenerator are recorded with the size,
+    environments with a layout bank cannot be recorded.
+
+    Read recordings with TrajectoryDataset.
+
+    Args:
+        env: Environment to record.
+        directory: Directory of the recording, created if missing.
+        chunk_size: Steps handed to the writer thread at a time.
+        capacity: Steps allocated up front, the files grow when they are full.
+    """
+
+    def __init__(
+        self,
+        env: Craft2dEnv,
+        directory: str,
+        chunk_size: int = 4096,
+        capacity: int = 1 << 20,
+    ):
+        craft_env = env.unwrapped
+        if craft_env.layout_bank is not None:
+            raise ValueError("Environments with a layout bank cannot be recorded.")
+        super().__init__(env)
+        self.directory = directory
+        self.chunk_size = chunk_size
+        os.makedirs(directory, exist_ok=True)
+
+        window_shape = craft_env.observation_engine.grid.shape
+        with open(os.path.join(directory, "recording.json"), "w") as file:
+            json.dump(_env_config(craft_env), file)
+
+        self._steps = ColumnStore(
+            directory, "steps", _columns(STEP_COLUMNS, window_shape), capacity
+        )
+        self._episodes = ColumnStore(
+            directory,
+            "episodes",
+            _columns(EPISODE_COLUMNS, window_shape),
+            max(capacity // 64, 1),
+        )
+        self._step_rows = _empty_rows(STEP_COLUMNS)
+        self._episode_rows = _empty_rows(EPISODE_COLUMNS)
+        self.n_steps = 0
+        self.n_episodes = 0
+        self._episode = None
+        self._observation = None
+
+        self._queue = queue.Queue(maxsize=4)
+        self._error = None
+        self._writer = threading.Thread(target=self._write_chunks, daemon=True)
+        self._writer.start()
+
+    def reset(self, *, seed: int = None, options: dict = None):
+        self._end_episode()
+        if seed is None:
+            # Every episode needs a seed to be replayed
+            seed = int(self.env.unwrapped.np_random.integers(2**31))
+        if options is None:
+            obs = self.env.reset(seed=seed)
+        else:
+            obs = self.env.reset(seed=seed, options=options)
+
+        craft_env = self.env.unwrapped
+        self._episode = {
+            "start": self.n_steps,
+            "seed": seed,
+            "task_object": _task_object_code(craft_env.task_object),
+            "task_object_count": TASK_COUNTS.index(craft_env.task_object_count),
+        }
+        self._observation = self._observe()
+        return obs
+
+    def step(self, action: int):
+        obs, reward, done, truncated, info = self.env.step(action)
+
+        rows = self._step_rows
+        position, grid, direction, props = self._observation
+        rows["episode"].append(self.n_episodes)
+        rows["position"].append(position)
+        rows["grid"].append(grid)
+        rows["direction"].append(direction)
+        rows["props"].append(props)
+        rows["action"].append(action)
+        rows["reward"].append(info.get("task_reward", reward))
+        rows["done"].append(done)
+        self.n_steps += 1
+        self._observation = self._observe()
+
+        if done or truncated:
+            self._end_episode()
+        if len(rows["action"]) >= self.chunk_size:
+            self._hand_off()
+        return obs, reward, done, truncated, info
+
+    def flush(self):
+        """Write everything recorded so far and wait until it is on disk."""
+        self._hand_off()
+        self._queue.join()
+        self._raise_writer_error()
+
+    def close(self):
+        self._end_episode()
+        self.flush()
+        self._queue.put(None)
+        self._writer.join()
+        super().close()
+
+    def _observe(self):
+        return _observation_row(self.env.unwrapped)
+
+    def _end_episode(self):
+        if self._episode is None:
+            return
+
+        rows = self._episode_rows
+        for column, value in self._episode.items():
+            rows[column].append(value)
+        rows["length"].append(self.n_steps - self._episode["start"])
+        position, grid, direction, props = self._observation
+        rows["final_position"].append(position)
+        rows["final_grid"].append(grid)
+        rows["final_direction"].append(direction)
+        rows["final_props"].append(props)
+
+        self.n_episodes += 1
+        self._episode = None
+
+    def _hand_off(self):
+        self._raise_writer_error()
+        self._queue.put((self._step_rows, self._episode_rows))
+        self._step_rows = _empty_rows(STEP_COLUMNS)
+        self._episode_rows = _empty_rows(EPISODE_COLUMNS)
+
+    def _write_chunks(self):
+        while True:
+            chunk = self._queue.get()
+            try:
+                if chunk is None:
+                    return
+
+                for store, rows in zip((self._steps, self._episodes), chunk):
+                    if rows[next(iter(rows))]:
+                        store.append(_stack_rows(store.columns, rows))
+                # Steps are made visible first so episodes never point past them
+                self._steps.flush()
+                self._episodes.flush()
+            except Exception as error:  # Raised again in the recording thread
+                self._error = error
+            finally:
+                self._queue.task_done()
+
+    def _raise_writer_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise RuntimeError("Writing the recording failed.") from error
+
+
+class TrajectoryDataset:
+    """Recording of a TrajectoryRecorder, with columns memory-mapped read-only.
+
+    steps and episodes map column names to arrays, see STEP_COLUMNS and
+    EPISODE_COLUMNS.
+
+    Args:
+        directory: Directory of the recording.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, "recording.json")) as file:
+            self.config = json.load(file)
+        self.steps = ColumnStore.load(directory, "steps")
+        self.episodes = ColumnStore.load(directory, "episodes")
+
+    def __len__(self):
+        return len(self.steps["action"])
+
+    @property
+    def n_episodes(self):
+        return len(self.episodes["start"])
+
+    def episode(self, index: int) -> dict:
+        """Step columns of an episode, sliced without copying."""
+        start = self.episodes["start"][index]
+        stop = start + self.episodes["length"][index]
+        return {column: array[start:stop] for column, array in self.steps.items()}
+
+    def task_options(self, index: int) -> dict:
+        """Reset options of an episode."""
+        return {
+            "task_object": _task_object(self.episodes["task_object"][index]),
+            "task_object_count": TASK_COUNTS[self.episodes["task_object_count"][index]],
+        }
+
+    def make_env(self, render_mode: str = None) -> Craft2dEnv:
+        """Craft2dEnv configured like the recorded one.
+
+        Recordings of generated layouts store the WorldGenerator arguments under
+        "generator", the layout of an episode is then drawn from its seed.
+        Recordings without crafting rules, reward mode or viewport used the
+        defaults.
+        """
+        return _make_env(self.config, render_mode)
+
+    def reset(self, index: int, env: Craft2dEnv):
+        """Reset env to the start of an episode, returns the first observation."""
+        seed = int(self.episodes["seed"][index])
+        return env.reset(
+            seed=None if seed == NO_SEED else seed, options=self.task_options(index)
+        )
+
+    def replay(self, index: int, env: Craft2dEnv = None, render_steps=()):
+        """Re-simulate an episode from its seed and actions.
+
+        Yields (obs, reward, done, frame) per step, frame is an RGB array for the
+        steps in render_steps and None otherwise, so rendering only costs time
+        where it is asked for. env must be configured like the recorded one, it
+        is made by make_env when it is None.
+        """
+        if env is None:
+            env = self.make_env("rgb_array" if len(render_steps) else None)
+
+        self.reset(index, env)
+        render_steps = set(render_steps)
+        for step, action in enumerate(self.episode(index)["action"].tolist()):
+            obs, reward, done, _, _ = env.step(action)
+            frame = env.render() if step in render_steps else None
+            yield obs, reward, done, frame
+
+
+def _env_config(craft_env):
+    # Everything replays need to rebuild the environment, as JSON
+    config = {
+        "n_rows": craft_env.n_rows,
+        "n_cols": craft_env.n_cols,
+        "view_radius": craft_env.view_radius,
+        "reward_mode": craft_env.reward_mode,
+        "viewport": craft_env.viewport,
+        "recipes": [[list(recipe) for recipe in stage] for stage in craft_env.recipes],
+        "collectibles": [list(collectible) for collectible in craft_env.collectibles],
+    }
+    if craft_env.generator is not None:
+        config["generator"] = {
+            "resource_counts": craft_env.generator.resource_counts,
+            "max_attempts": craft_env.generator.max_attempts,
+        }
+    return config
+
+
+def _make_env(config, render_mode):
+    kwargs = {}
+    if "generator" in config:
+        kwargs["generator"] = WorldGenerator(
+            config["n_rows"], config["n_cols"], **config["generator"]
+        )
+    if "recipes" in config:
+        kwargs["recipes"] = tuple(
+            tuple(Recipe(*recipe) for recipe in stage) for stage in config["recipes"]
+        )
+        kwargs["collectibles"] = tuple(
+            Collectible(*collectible) for collectible in config["collectibles"]
+        )
+    if config.get("viewport") is not None:
+        kwargs["viewport"] = tuple(config["viewport"])
+    return Craft2dEnv(
+        config["n_rows"],
+        config["n_cols"],
+        render_mode=render_mode,
+        view_radius=config["view_radius"],
+        reward_mode=config.get("reward_mode", "task"),
+        **kwargs,
+    )
+
+
+def _columns(columns, window_shape):
+    return {
+        column: (dtype, window_shape if shape == "window" else shape)
+        for column, (dtype, shape) in columns.items()
+    }
+
+
+def _observation_row(craft_env):
+    # Grids are kept as bytes, cheaper than copies and joined in one go later
+    position = craft_env.agent_position
+    return (
+        position,
+        craft_env.observation_engine.window(position).tobytes(),
+        DIRECTION_INDICES[craft_env.direction.tobytes()],
+        PROPS_CODES[craft_env.interaction_props],
+    )
+
+
+def _stack_rows(columns, rows):
+    arrays = {}
+    for column, values in rows.items():
+        dtype, shape = columns[column]
+        if column in ("grid", "final_grid"):
+            arrays[column] = np.frombuffer(b"".join(values), dtype=dtype).reshape(
+                -1, *shape
+            )
+        else:
+            arrays[column] = np.array(values, dtype=dtype)
+    return arrays
+
+
+def _empty_rows(columns):
+    return {column: [] for column in columns}
+
+
+def _task_object_code(task_object):
+    return 0 if task_object is None else PROPS.index(task_object) + 1
+
+
+def _task_object(code):
+    return None if code == 0 else PROPS[code - 1]
@@ -0,0 +1,128 @@
+import numpy as np
+
+from craft2d.env.environment import PROPOSITION_BITS
+
+# Labels are uint16, tables hold one column per possible label
+N_LABELS = 1 << 16
+
+
+class RewardMachine:
+    """Reward machine over the uint16 labels of Craft2dEnv and Craft2dVecEnv.
+
+    Transitions are (state, condition, next_state, reward) tuples. A condition
+    is a formula over PROPOSITIONS in disjunctive normal form, for example
+    "WD & CL | GM & CL" or "P & !M1", or "true". Where several transitions of a
+    state match a label the first one listed is taken, labels matching none stay
+    in the state without reward.
+
+    Transitions are compiled into next_states and rewards tables indexed by
+    (state, label), so advancing any number of machines is two lookups.
+
+    Args:
+        n_states: Number of automaton states.
+        transitions: Transitions as described above.
+        initial_state: State of the machines after reset.
+        terminal_states: States that end the task of the machine.
+    """
+
+    def __init__(
+        self,
+        n_states: int,
+        transitions: list,
+        initial_state: int = 0,
+        terminal_states: tuple = (),
+    ):
+        self.n_states = n_states
+        self.initial_state = initial_state
+        self.next_states = np.repeat(
+            np.arange(n_states, dtype=np.int16)[:, None], N_LABELS, axis=1
+        )
+        self.rewards = np.zeros((n_states, N_LABELS), dtype=np.float32)
+        self.terminal = np.zeros(n_states, dtype=bool)
+        self.terminal[list(terminal_states)] = True
+
+        labels = np.arange(N_LABELS, dtype=np.uint32)
+        assigned = np.zeros((n_states, N_LABELS), dtype=bool)
+        for state, condition, next_state, reward in transitions:
+            match = np.zeros(N_LABELS, dtype=bool)
+            for required, forbidden in compile_condition(condition):
+                match |= ((labels & required) == required) & ((labels & forbidden) == 0)
+            match &= ~assigned[state]
+            assigned[state] |= match
+            self.next_states[state, match] = next_state
+            self.rewards[state, match] = reward
+
+    @classmethod
+    def sequence(cls, conditions: list, reward: float = 1.0) -> "RewardMachine":
+        """Machine rewarding conditions that hold in order, ending after the last.
+
+        State i waits for conditions[i], only the last one is rewarded.
+        """
+        n_events = len(conditions)
+        transitions = [
+            (state, condition, state + 1, reward if state == n_events - 1 else 0.0)
+            for state, condition in enumerate(conditions)
+        ]
+        return cls(n_events + 1, transitions, terminal_states=(n_events,))
+
+    def step(self, states: np.ndarray, labels: np.ndarray):
+        """Next states and rewards of machines in states observing labels."""
+        return self.next_states[states, labels], self.rewards[states, labels]
+
+
+class RewardMachineRunner:
+    """Advances one reward machine per env of a batch.
+
+    Feed it the labels of every step, from info["labels"] of Craft2dVecEnv, and
+    the dones of the env so machines restart with their episodes.
+
+    Args:
+        machine: Reward machine shared by the envs.
+        num_envs: Number of envs.
+    """
+
+    def __init__(self, machine: RewardMachine, num_envs: int):
+        self.machine = machine
+        self.states = np.full(num_envs, machine.initial_state, dtype=np.int16)
+
+    def reset(self, mask: np.ndarray = None):
+        """Restart the machines where mask is set, all of them by default."""
+        if mask is None:
+            self.states[:] = self.machine.initial_state
+        else:
+            self.states[mask] = self.machine.initial_state
+
+    def step(self, labels: np.ndarray, dones: np.ndarray = None):
+        """Advance on labels, returns the rewards and the machines that finished.
+
+        Machines that finished or whose env is done restart afterwards.
+        """
+        self.states, rewards = self.machine.step(self.states, labels)
+        finished = self.machine.terminal[self.states]
+        if dones is not None:
+            self.reset(finished | dones)
+        else:
+            self.reset(finished)
+        return rewards, finished
+
+
+def compile_condition(condition) -> list:
+    """(required, forbidden) bit masks of each conjunction of a condition."""
+    if condition.strip() == "true":
+        return [(0, 0)]
+
+    conjunctions = []
+    for conjunction in condition.split("|"):
+        required = forbidden = 0
+        for literal in conjunction.split("&"):
+            literal = literal.strip()
+            negated = literal.startswith("!")
+            name = literal.lstrip("!").strip()
+            if name not in PROPOSITION_BITS:
+                raise ValueError(f"Unknown proposition {name!r} in {condition!r}.")
+            if negated:
+                forbidden |= PROPOSITION_BITS[name]
+            else:
+                required |= PROPOSITION_BITS[name]
+        conjunctions.append((required, forbidden))
+    return conjunctions
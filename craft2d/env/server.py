@@ -0,0 +1,347 @@
+import argparse
+import asyncio
+import os
+import socket
+import struct
+import sys
+
+import gymnasium as gym
+import numpy as np
+
+from craft2d.env.encoding import DIRECTION_INDICES, PROPS_CODES, PROPS_OF_CODES
+from craft2d.env.environment import PROPS, TASK_COUNTS, Craft2dEnv
+from craft2d.env.vector import DIRECTION_ONE_HOT
+
+# Request ops
+RESET = 1
+STEP = 2
+CLOSE = 3
+
+# Response status
+OK = 0
+ERROR = 1
+
+NO_SEED = -1
+
+# Every message is little-endian and fixed size apart from error messages
+# Server to client on connect: n_rows, n_cols, window rows, window cols
+HANDSHAKE = struct.Struct("<IIII")
+# Client to server: op, action, task object (0 for None, else PROPS index + 1),
+# task count (1 to 5) and reset seed (NO_SEED for None)
+REQUEST = struct.Struct("<BBBBq")
+# Server to client: status, reward, done, truncated, labels, then the
+# observation as row, col, direction index, props code and the window cells
+RESPONSE = struct.Struct("<BfBBHiiBH")
+# Error responses carry the status and a length prefixed UTF-8 message instead
+ERROR_LENGTH = struct.Struct("<I")
+
+
+class Craft2dServer:
+    """Hosts Craft2dEnv instances for clients on a Unix domain socket.
+
+    Every connection gets its own environment from a pool that is reused when
+    clients disconnect. Requests are queued and run together once
+    batch_window seconds passed since the first one, or right away when every
+    connected client is waiting, so one event loop turn steps all waiting
+    environments and writes their responses. See HANDSHAKE, REQUEST and
+    RESPONSE for the protocol, Craft2dClient speaks it.
+
+    Args:
+        path: Path of the Unix domain socket, replaced if it exists.
+        n_rows: Number of rows of the hosted environments.
+        n_cols: Number of columns of the hosted environments.
+        batch_window: Seconds to wait for more requests before stepping.
+        view_radius: View radius of the observations, None for the full map.
+        backend: Step backend of the environments, see Craft2dEnv.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        n_rows: int,
+        n_cols: int,
+        batch_window: float = 0.0005,
+        view_radius: int = 1,
+        backend: str = "python",
+    ):
+        self.path = path
+        self.n_rows = n_rows
+        self.n_cols = n_cols
+        self.batch_window = batch_window
+        self.view_radius = view_radius
+        self.backend = backend
+
+        if view_radius is None:
+            self.window_shape = (n_rows, n_cols)
+        else:
+            self.window_shape = (2 * view_radius + 1, 2 * view_radius + 1)
+        self.handshake = HANDSHAKE.pack(n_rows, n_cols, *self.window_shape)
+
+        self._free_envs = []
+        self._n_clients = 0
+        self._pending = []
+        self._batch_handle = None
+        self._server = None
+
+    async def start(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        loop = asyncio.get_running_loop()
+        self._server = await loop.create_unix_server(
+            lambda: _ClientProtocol(self), self.path
+        )
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def _connect(self, transport):
+        self._n_clients += 1
+        transport.write(self.handshake)
+        return self._acquire_env()
+
+    def _disconnect(self, env):
+        self._n_clients -= 1
+        self._pending = [item for item in self._pending if item[0] is not env]
+        self._free_envs.append(env)
+        if self._pending:
+            self._schedule_batch()
+
+    def _submit(self, env, request, transport):
+        self._pending.append((env, request, transport))
+        self._schedule_batch()
+
+    def _acquire_env(self):
+        if self._free_envs:
+            return self._free_envs.pop()
+        return Craft2dEnv(
+            self.n_rows,
+            self.n_cols,
+            render_mode=None,
+            view_radius=self.view_radius,
+            backend=self.backend,
+        )
+
+    def _schedule_batch(self):
+        # Every client is waiting, no more requests can arrive before stepping
+        if len(self._pending) >= self._n_clients:
+            if self._batch_handle is not None:
+                self._batch_handle.cancel()
+            self._run_batch()
+        elif self._batch_handle is None:
+            loop = asyncio.get_running_loop()
+            self._batch_handle = loop.call_later(self.batch_window, self._run_batch)
+
+    def _run_batch(self):
+        self._batch_handle = None
+        pending, self._pending = self._pending, []
+        for env, request, transport in pending:
+            try:
+                response = self._handle_request(env, *request)
+            except Exception as error:
+                message = f"{type(error).__name__}: {error}".encode()
+                response = bytes((ERROR,)) + ERROR_LENGTH.pack(len(message)) + message
+            transport.write(response)
+
+    def _handle_request(self, env, op, action, task_object, task_count, seed):
+        if op == STEP:
+            obs, reward, done, truncated, info = env.step(action)
+            labels = info["labels"]
+        elif op == RESET:
+            if not 1 <= task_count <= len(TASK_COUNTS):
+                raise ValueError(f"Unknown task count: {task_count}")
+            options = {
+                "task_object": None if task_object == 0 else PROPS[task_object - 1],
+                "task_object_count": TASK_COUNTS[task_count - 1],
+            }
+            obs = env.reset(seed=None if seed == NO_SEED else seed, options=options)
+            reward, done, truncated, labels = 0, False, False, 0
+        else:
+            raise ValueError(f"Unknown request op: {op}")
+
+        position, grid, direction, props = obs
+        return (
+            RESPONSE.pack(
+                OK,
+                reward,
+                done,
+                truncated,
+                labels,
+                position[0],
+                position[1],
+                DIRECTION_INDICES[direction.tobytes()],
+                PROPS_CODES[props],
+            )
+            + grid.astype(np.int8).tobytes()
+        )
+
+
+class _ClientProtocol(asyncio.Protocol):
+    """Connection of one client, splits the byte stream into requests."""
+
+    def __init__(self, server: Craft2dServer):
+        self.server = server
+        self.buffer = bytearray()
+        self.transport = None
+        self.env = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.env = self.server._connect(transport)
+
+    def data_received(self, data):
+        self.buffer += data
+        n_requests = len(self.buffer) // REQUEST.size
+        for request in REQUEST.iter_unpack(self.buffer[: n_requests * REQUEST.size]):
+            if request[0] == CLOSE:
+                self.transport.close()
+                return
+            self.server._submit(self.env, request, self.transport)
+        del self.buffer[: n_requests * REQUEST.size]
+
+    def connection_lost(self, exc):
+        self.server._disconnect(self.env)
+
+
+class Craft2dClient(gym.Env):
+    """Gymnasium environment backed by a Craft2dServer environment.
+
+    Observations, rewards, done flags and info["labels"] match those of a local
+    Craft2dEnv with the same configuration.
+
+    Args:
+        path: Path of the Unix domain socket of the server.
+        timeout: Seconds to wait for the server, None waits forever.
+    """
+
+    def __init__(self, path: str, timeout: float = None):
+        super().__init__()
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.settimeout(timeout)
+        self._socket.connect(path)
+        self._file = self._socket.makefile("rb")
+
+        self.n_rows, self.n_cols, window_rows, window_cols = HANDSHAKE.unpack(
+            self._read(HANDSHAKE.size)
+        )
+        self.window_shape = (window_rows, window_cols)
+        self._grid_size = window_rows * window_cols
+
+        # Spaces of the matching local environment
+        env = Craft2dEnv(self.n_rows, self.n_cols, render_mode=None)
+        self.action_space = env.action_space
+        self.observation_space = env.observation_space
+        self.reward_range = env.reward_range
+
+    def reset(
+        self,
+        seed: int = None,
+        options: dict[str, str] = {
+            "task_object": "WD",
+            "task_object_count": "M1",
+        },
+    ):
+        super().reset(seed=seed)
+        task_object = options["task_object"]
+        self._send(
+            RESET,
+            0,
+            0 if task_object is None else PROPS.index(task_object) + 1,
+            TASK_COUNTS.index(options["task_object_count"]) + 1,
+            NO_SEED if seed is None else seed,
+        )
+        return self._receive()[0]
+
+    def step(self, action: int):
+        self._send(STEP, int(action), 0, 0, NO_SEED)
+        return self._receive()
+
+    def close(self):
+        if self._socket is not None:
+            try:
+                self._send(CLOSE, 0, 0, 0, NO_SEED)
+            except OSError:
+                pass
+            self._file.close()
+            self._socket.close()
+            self._socket = None
+
+    def _send(self, *request):
+        self._socket.sendall(REQUEST.pack(*request))
+
+    def _receive(self):
+        status = self._read(1)[0]
+        if status == ERROR:
+            (length,) = ERROR_LENGTH.unpack(self._read(ERROR_LENGTH.size))
+            raise RuntimeError(f"Server error: {self._read(length).decode()}")
+
+        (
+            _,
+            reward,
+            done,
+            truncated,
+            labels,
+            row,
+            col,
+            direction,
+            props_code,
+        ) = RESPONSE.unpack(bytes((status,)) + self._read(RESPONSE.size - 1))
+        grid = np.frombuffer(self._read(self._grid_size), dtype=np.int8)
+
+        obs = (
+            np.array([row, col]),
+            grid.astype(np.int64).reshape(self.window_shape),
+            DIRECTION_ONE_HOT[direction].copy(),
+            PROPS_OF_CODES[props_code],
+        )
+        # Rewards are 0 or 1, keep the int type of Craft2dEnv
+        return obs, int(reward), bool(done), bool(truncated), {"labels": labels}
+
+    def _read(self, size):
+        data = self._file.read(size)
+        if len(data) < size:
+            raise ConnectionError("Craft2dServer closed the connection.")
+        return data
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m craft2d.env.server",
+        description="Serve Craft2dEnv instances on a Unix domain socket.",
+    )
+    parser.add_argument("path", help="Path of the Unix domain socket.")
+    parser.add_argument("--rows", type=int, default=12)
+    parser.add_argument("--cols", type=int, default=12)
+    parser.add_argument("--batch-window", type=float, default=0.0005)
+    parser.add_argument("--backend", default="python")
+    args = parser.parse_args(argv)
+
+    server = Craft2dServer(
+        args.path,
+        args.rows,
+        args.cols,
+        batch_window=args.batch_window,
+        backend=args.backend,
+    )
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if os.path.exists(args.path):
+            os.unlink(args.path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,490 @@
+import gymnasium as gym
+import numpy as np
+
+from craft2d.config import COLLECTIBLES, RECIPES
+from craft2d.env.crafting import NO_RECIPE, CraftingRules
+from craft2d.env.environment import (
+    BACKENDS,
+    BRIDGE,
+    BRIDGE_INV,
+    CRAFTING_TABLE,
+    EMPTY,
+    ENVIRONMENT_OBJECTS,
+    INTERACT,
+    INVENTORY_OBJECTS,
+    OUT_OF_BOUNDS,
+    PASSABLE,
+    PRINCESS,
+    PROPOSITION_BITS,
+    PROPS,
+    REWARD_MODES,
+    TASK_COUNTS,
+    TASK_SPEC_COUNTS,
+    TASK_SPEC_INDICES,
+    WATER,
+    Craft2dEnv,
+    props_label,
+)
+from craft2d.env.generator import LayoutBank
+from craft2d.env.observation import viewport_origin
+
+# Interaction codes, the tuple at each index is the matching interaction_props
+INTERACTION_PROPS = (
+    (),
+    ("WD", "CL"),
+    ("STN", "CL"),
+    ("GRS", "CL"),
+    ("GM", "CL"),
+    ("STKS", "CL"),
+    ("RP", "CL"),
+    ("BRG", "CL"),
+    ("W-BSC", "CL"),
+    ("W-ADV", "CL"),
+    ("P",),
+    None,  # Task set, props are (task_object, task_object_count) of the env
+)
+NO_PROPS = 0
+TASK_SET = len(INTERACTION_PROPS) - 1
+PRINCESS_PROPS = INTERACTION_PROPS.index(("P",))
+INTERACTION_CODES = {
+    props: code for code, props in enumerate(INTERACTION_PROPS) if props is not None
+}
+# Labels by interaction code, task set labels depend on the task of each env
+INTERACTION_LABELS = np.array(
+    [0 if props is None else props_label(props) for props in INTERACTION_PROPS],
+    dtype=np.uint16,
+)
+# Labels of the task objects by PROPS index and of the counts by value, -1
+# indexes the last entry which sets no bit for a missing task object
+TASK_OBJECT_LABELS = np.array(
+    [PROPOSITION_BITS[obj] for obj in PROPS] + [0], dtype=np.uint16
+)
+TASK_COUNT_LABELS = np.array(
+    [0] + [PROPOSITION_BITS[count] for count in TASK_COUNTS], dtype=np.uint16
+)
+
+# Row and column offsets per direction, the last entry is for no direction
+DIRECTION_OFFSETS = np.array([[0, 1], [0, -1], [-1, 0], [1, 0], [0, 0]])
+DIRECTION_ONE_HOT = np.vstack([np.eye(4), np.zeros((1, 4))])
+
+
+class Craft2dVecEnv:
+    """N independent Craft2d worlds stepped together with array operations.
+
+    Every world shares the layout of Craft2dEnv and follows its dynamics, or with
+    layout_bank set each episode draws its own layout from the bank. Worlds
+    that complete their task are reset automatically, the observation returned
+    for them is the first observation of the new episode and the last one of the
+    finished episode is stored in info["final_observation"].
+
+    Observations are a tuple of batched arrays: (positions (N, 2), local grids
+    (N, 3, 3), directions (N, 4), interaction codes (N,)). Interaction codes index
+    INTERACTION_PROPS, use interaction_props() to turn them into tuples. With
+    observation_mode="encoded" observations are int64 keys with shape (N,), see
+    ObservationEncoder.
+
+    With reward_mode="all-tasks" rewards have shape (N, len(TASK_SPECS)), the
+    reward of every task spec, and info["task_reward"] holds the rewards of the
+    tasks passed to reset, which still decide when episodes end.
+
+    Every step also reports the propositions that hold as uint16 labels with
+    shape (N,) in info["labels"] and self.labels, see PROPOSITIONS.
+    """
+
+    def __init__(
+        self,
+        num_envs: int,
+        n_rows: int,
+        n_cols: int,
+        render_mode: str = None,
+        window_width: int = 600,
+        window_height: int = 600,
+        layout_bank: LayoutBank = None,
+        observation_mode: str = "tuple",
+        recipes: tuple = RECIPES,
+        collectibles: tuple = COLLECTIBLES,
+        reward_mode: str = "task",
+        viewport: tuple[int, int] = None,
+        backend: str = "python",
+        with_action_mask: bool = False,
+    ):
+        self.num_envs = num_envs
+        self.n_rows = n_rows
+        self.n_cols = n_cols
+        self.render_mode = render_mode
+        # Rows and columns around each agent drawn by render, None draws the map
+        self.viewport = None
+        if viewport is not None:
+            self.viewport = (min(viewport[0], n_rows), min(viewport[1], n_cols))
+        self.n_inv_objects = len(INVENTORY_OBJECTS)
+
+        self.single_action_space = gym.spaces.Discrete(5)
+        self.action_space = gym.spaces.MultiDiscrete(np.full(num_envs, 5))
+        self.single_observation_space = Craft2dEnv(
+            n_rows, n_cols, render_mode=None, observation_mode=observation_mode
+        ).observation_space
+        self.reward_range = (0, 1)
+        if reward_mode not in REWARD_MODES:
+            raise ValueError(f"Unknown reward_mode: {reward_mode}")
+        self.reward_mode = reward_mode
+
+        # Grids are stored with a border of out of bounds cells
+        self._padded_grids = np.full(
+            (num_envs, n_rows + 2, n_cols + 2), OUT_OF_BOUNDS, dtype=np.int8
+        )
+        self.grids = self._padded_grids[:, 1:-1, 1:-1]
+        self.inventories = np.zeros((num_envs, self.n_inv_objects), dtype=np.int32)
+        self.positions = np.zeros((num_envs, 2), dtype=np.int64)
+        # Index into DIRECTION_OFFSETS, 4 means no direction yet
+        self.directions = np.full(num_envs, 4, dtype=np.int64)
+        self.interactions = np.zeros(num_envs, dtype=np.int8)
+        self.labels = np.zeros(num_envs, dtype=np.uint16)
+
+        self.task_objects = np.zeros(num_envs, dtype=np.int64)
+        self.task_counts = np.ones(num_envs, dtype=np.int64)
+        self.task_set = np.zeros(num_envs, dtype=bool)
+        self.task_completed = np.zeros(num_envs, dtype=bool)
+        self.n_steps = np.zeros(num_envs, dtype=np.int64)
+
+        self._env_idx = np.arange(num_envs)
+        self._window = np.arange(-1, 2)
+        self.initial_grid = None
+        if layout_bank is not None:
+            bank_shape = (layout_bank.n_rows, layout_bank.n_cols)
+            if bank_shape != (n_rows, n_cols):
+                raise ValueError(
+                    f"Layout bank holds {bank_shape[0]}x{bank_shape[1]} layouts, "
+                    f"expected {n_rows}x{n_cols}."
+                )
+        self.layout_bank = layout_bank
+
+        # Interaction codes of the recipes and collectibles, by recipe and cell code
+        self.rules = CraftingRules(
+            ENVIRONMENT_OBJECTS, INVENTORY_OBJECTS, recipes, collectibles
+        )
+        self._recipe_interactions = np.array(
+            [_interaction_code(props) for props in self.rules.recipe_props]
+        )
+        self._collectible = np.array(
+            [idx is not None for idx in self.rules.collect_inventory]
+        )
+        self._collect_interactions = {
+            code: _interaction_code(self.rules.collect_props[code])
+            for code in self.rules.collectible_codes
+        }
+
+        # Actions that change the state are returned in info["action_mask"]
+        self.with_action_mask = with_action_mask
+
+        # With backend="numba" worlds are stepped by one compiled kernel call
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend: {backend}")
+        self.backend = backend
+        self._step_kernel = None
+        if backend != "python":
+            from craft2d.env import kernels
+
+            self._kernel_tables = kernels.build_tables(self.rules)
+            if backend == "kernels-py":
+                self._step_kernel = kernels.step_batch_py
+            elif kernels.HAS_NUMBA:
+                self._step_kernel = kernels.step_batch
+            else:
+                gym.logger.warn(
+                    "numba is not installed, Craft2dVecEnv falls back to the "
+                    "python backend."
+                )
+
+        self.observation_mode = observation_mode
+        self.encoder = None
+        if observation_mode == "encoded":
+            from craft2d.env.encoding import ObservationEncoder
+
+            self.encoder = ObservationEncoder(n_rows, n_cols)
+        elif observation_mode != "tuple":
+            raise ValueError(f"Unknown observation_mode: {observation_mode}")
+        self.np_random = np.random.default_rng()
+
+        # Renderer is built on the first call to render
+        self.renderer = None
+        self._window_size = (window_width, window_height)
+
+    def reset(self, seed: int = None, options: dict = None):
+        if options is None:
+            options = {"task_object": "WD", "task_object_count": "M1"}
+
+        if seed is not None:
+            self.np_random = np.random.default_rng(seed)
+
+        # Without a bank the layout is generated by Craft2dEnv so both envs
+        # share the same world, bank layouts are drawn by _reset_envs
+        if self.layout_bank is None:
+            env = Craft2dEnv(self.n_rows, self.n_cols, render_mode=None)
+            env.reset(seed=seed)
+            self.initial_grid = env.cells.copy()
+
+        self.task_objects[:] = self._task_object_indices(options["task_object"])
+        self.task_counts[:] = self._task_count_values(options["task_object_count"])
+        self.task_labels = (
+            TASK_OBJECT_LABELS[self.task_objects] | TASK_COUNT_LABELS[self.task_counts]
+        )
+        self.labels = np.zeros(self.num_envs, dtype=np.uint16)
+        self._reset_envs(np.ones(self.num_envs, dtype=bool))
+        return self._create_observation()
+
+    def step(self, actions: np.ndarray):
+        actions = np.asarray(actions)
+        self.interactions[:] = NO_PROPS
+        self.n_steps += 1
+
+        if self._step_kernel is not None:
+            self._step_kernel(
+                self.grids,
+                self.inventories,
+                self.positions,
+                self.directions,
+                actions,
+                self.task_objects,
+                self.task_set,
+                self.interactions,
+                *self._kernel_tables,
+            )
+        else:
+            interact = actions == INTERACT
+            move = ~interact
+            self._update_positions(move, actions)
+            self.directions[move] = actions[move]
+            self._handle_interact_actions(interact)
+
+        obs = self._create_observation()
+
+        task_count = self.inventories[self._env_idx, np.maximum(self.task_objects, 0)]
+        rewards = (
+            (self.interactions == PRINCESS_PROPS)
+            & (self.task_objects >= 0)
+            & (task_count == self.task_counts)
+        )
+        self.task_completed |= rewards
+        dones = rewards.copy()
+        truncated = np.zeros(self.num_envs, dtype=bool)
+
+        self.labels = np.where(
+            self.interactions == TASK_SET,
+            self.task_labels,
+            INTERACTION_LABELS[self.interactions],
+        )
+        infos = {"labels": self.labels}
+        rewards = rewards.astype(np.float64)
+        if self.reward_mode == "all-tasks":
+            infos["task_reward"] = rewards
+            # Every task spec compared against the inventories at once
+            rewards = (
+                (self.interactions == PRINCESS_PROPS)[:, None]
+                & (self.inventories[:, TASK_SPEC_INDICES] == TASK_SPEC_COUNTS)
+            ).astype(np.float64)
+        if dones.any():
+            infos["final_observation"] = obs
+            infos["_final_observation"] = dones
+            self._reset_envs(dones)
+            obs = self._create_observation()
+        if self.with_action_mask:
+            infos["action_mask"] = self.action_masks()
+        return obs, rewards, dones, truncated, infos
+
+    def render(self):
+        """Render every world, returns frames with shape (N, height, width, 3)."""
+        if self.render_mode != "rgb_array":
+            gym.logger.warn("Craft2dVecEnv only renders with render_mode='rgb_array'.")
+            return
+
+        n_rows, n_cols = self.viewport or (self.n_rows, self.n_cols)
+        if self.renderer is None:
+            from craft2d.render.render import NumpyRenderer
+
+            self.renderer = NumpyRenderer(
+                n_rows=n_rows,
+                n_cols=n_cols,
+                env_objects=ENVIRONMENT_OBJECTS,
+                inv_objects=INVENTORY_OBJECTS,
+                window_width=self._window_size[0],
+                window_height=self._window_size[1],
+            )
+
+        quests = [
+            (
+                self.task_set[env_idx],
+                PROPS[task_object] if task_object >= 0 else None,
+                TASK_COUNTS[self.task_counts[env_idx] - 1],
+                self.task_completed[env_idx],
+                False,
+            )
+            for env_idx, task_object in enumerate(self.task_objects)
+        ]
+        grids = self.grids
+        positions = self.positions
+        if self.viewport is not None:
+            # Camera follows each agent, windows are gathered from the grids
+            rows, cols = viewport_origin(
+                self.positions, self.viewport, self.n_rows, self.n_cols
+            )
+            rows = rows[:, None, None] + np.arange(n_rows)[None, :, None]
+            cols = cols[:, None, None] + np.arange(n_cols)[None, None, :]
+            grids = self.grids[self._env_idx[:, None, None], rows, cols]
+            positions = self.positions - np.stack([rows[:, 0, 0], cols[:, 0, 0]], 1)
+
+        return self.renderer.render_batch(
+            grids=grids,
+            inventories=self.inventories,
+            agent_positions=positions,
+            directions=DIRECTION_ONE_HOT[self.directions],
+            quests=quests,
+        )
+
+    def action_masks(self) -> np.ndarray:
+        """Actions that change the state, bool array with shape (N, 5).
+
+        Same rules as Craft2dEnv.action_mask, for the current observation of
+        every world.
+        """
+        masks = np.ones((self.num_envs, 5), dtype=bool)
+
+        # Cell in front of agent, the own cell without a direction
+        offsets = DIRECTION_OFFSETS[self.directions]
+        itr_rows = np.clip(self.positions[:, 0] + offsets[:, 0], 0, self.n_rows - 1)
+        itr_cols = np.clip(self.positions[:, 1] + offsets[:, 1], 0, self.n_cols - 1)
+        target = self.grids[self._env_idx, itr_rows, itr_cols]
+
+        # Moving on in the facing direction fails at the edge and when blocked
+        stuck = (
+            (itr_rows == self.positions[:, 0]) & (itr_cols == self.positions[:, 1])
+        ) | ~PASSABLE[target]
+        facing = self.directions < 4
+        masks[self._env_idx[facing], self.directions[facing]] = ~stuck[facing]
+
+        can_act = self.task_objects >= 0
+        masks[:, INTERACT] = (target == PRINCESS) | (
+            can_act
+            & (
+                self._collectible[target]
+                | ((target == WATER) & (self.inventories[:, BRIDGE_INV] > 0))
+                | (
+                    (target == CRAFTING_TABLE)
+                    & self.rules.can_craft_batch(self.inventories)
+                )
+            )
+        )
+        return masks
+
+    def interaction_props(self, interactions: np.ndarray = None):
+        """Convert interaction codes into the interaction_props of Craft2dEnv."""
+        if interactions is None:
+            interactions = self.interactions
+
+        props = []
+        for env_idx, code in enumerate(interactions):
+            if code == TASK_SET:
+                task_object = self.task_objects[env_idx]
+                props.append(
+                    (
+                        PROPS[task_object] if task_object >= 0 else None,
+                        TASK_COUNTS[self.task_counts[env_idx] - 1],
+                    )
+                )
+            else:
+                props.append(INTERACTION_PROPS[code])
+        return props
+
+    def _reset_envs(self, mask: np.ndarray):
+        if self.layout_bank is None:
+            self.grids[mask] = self.initial_grid
+        else:
+            self.grids[mask] = self.layout_bank.sample(self.np_random, mask.sum())
+        self.inventories[mask] = 0
+        self.positions[mask] = 0
+        self.directions[mask] = 4
+        # New episodes start without an interaction, as Craft2dEnv.reset
+        self.interactions[mask] = NO_PROPS
+        self.task_set[mask] = False
+        self.task_completed[mask] = False
+        self.n_steps[mask] = 0
+
+    def _create_observation(self):
+        # Padding keeps the 3x3 window in bounds, offset by one for the border
+        rows = self.positions[:, 0, None, None] + 1 + self._window[None, :, None]
+        cols = self.positions[:, 1, None, None] + 1 + self._window[None, None, :]
+        obs_grids = self._padded_grids[self._env_idx[:, None, None], rows, cols]
+
+        if self.encoder is not None:
+            props_codes = self.encoder.props_codes(
+                self.interactions, self.task_objects, self.task_counts
+            )
+            return self.encoder.encode_batch(
+                self.positions, obs_grids, self.directions, props_codes
+            )
+        return (
+            self.positions.copy(),
+            obs_grids,
+            DIRECTION_ONE_HOT[self.directions],
+            self.interactions.copy(),
+        )
+
+    def _update_positions(self, move: np.ndarray, actions: np.ndarray):
+        offsets = DIRECTION_OFFSETS[np.where(move, actions, 4)]
+        n_rows = np.clip(self.positions[:, 0] + offsets[:, 0], 0, self.n_rows - 1)
+        n_cols = np.clip(self.positions[:, 1] + offsets[:, 1], 0, self.n_cols - 1)
+
+        # Agent can only walk on empty cells and bridges
+        target = self.grids[self._env_idx, n_rows, n_cols]
+        valid = move & PASSABLE[target]
+        self.positions[valid, 0] = n_rows[valid]
+        self.positions[valid, 1] = n_cols[valid]
+
+    def _handle_interact_actions(self, interact: np.ndarray):
+        # Cell in front of agent
+        offsets = DIRECTION_OFFSETS[self.directions]
+        itr_rows = np.clip(self.positions[:, 0] + offsets[:, 0], 0, self.n_rows - 1)
+        itr_cols = np.clip(self.positions[:, 1] + offsets[:, 1], 0, self.n_cols - 1)
+        target = np.where(interact, self.grids[self._env_idx, itr_rows, itr_cols], 0)
+
+        # Princess sets the task on first interaction
+        princess = target == PRINCESS
+        self.interactions[princess & ~self.task_set] = TASK_SET
+        self.interactions[princess & self.task_set] = PRINCESS_PROPS
+        self.task_set |= princess
+
+        # Cannot interact before task specified
+        can_act = self.task_objects >= 0
+
+        for cell_code, interaction in self._collect_interactions.items():
+            collect = can_act & (target == cell_code)
+            self.inventories[collect, self.rules.collect_inventory[cell_code]] += 1
+            self.grids[collect, itr_rows[collect], itr_cols[collect]] = EMPTY
+            self.interactions[collect] = interaction
+
+        # Place bridge on water if agent has bridge in inventory
+        bridge = can_act & (target == WATER) & (self.inventories[:, BRIDGE_INV] > 0)
+        self.grids[bridge, itr_rows[bridge], itr_cols[bridge]] = BRIDGE
+        self.inventories[bridge, BRIDGE_INV] -= 1
+
+        self._handle_crafting_interactions(can_act & (target == CRAFTING_TABLE))
+
+    def _handle_crafting_interactions(self, craft: np.ndarray):
+        crafted = self.rules.craft_batch(self.inventories, craft)
+        fired = crafted != NO_RECIPE
+        self.interactions[fired] = self._recipe_interactions[crafted[fired]]
+
+    def _task_object_indices(self, task_object):
+        if task_object is None or isinstance(task_object, str):
+            task_object = [task_object] * self.num_envs
+        return [-1 if obj is None else PROPS.index(obj) for obj in task_object]
+
+    def _task_count_values(self, task_count):
+        if isinstance(task_count, str):
+            task_count = [task_count] * self.num_envs
+        return [TASK_COUNTS.index(count) + 1 for count in task_count]
+
+
+def _interaction_code(props):
+    if props not in INTERACTION_CODES:
+        raise ValueError(f"Interaction props {props} have no interaction code.")
+    return INTERACTION_CODES[props]
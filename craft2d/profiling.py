@@ -0,0 +1,100 @@
+import json
+import time
+from functools import wraps
+
+import numpy as np
+
+# Percentiles of the wall times listed in reports
+PERCENTILES = (50, 90, 99)
+
+
+class PhaseTimes:
+    """Call count, total, max and recent wall times of one profiled phase.
+
+    Count, total, mean and max cover every call, the percentiles only the last
+    max_samples times, which are kept in a ring buffer.
+    """
+
+    def __init__(self, max_samples: int):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = [0.0] * max_samples
+
+    def add(self, seconds: float):
+        self.samples[self.count % len(self.samples)] = seconds
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def summary(self) -> dict:
+        samples = np.array(self.samples[: min(self.count, len(self.samples))])
+        summary = {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+        }
+        for percentile in PERCENTILES:
+            summary[f"p{percentile}"] = (
+                float(np.percentile(samples, percentile)) if self.count else 0.0
+            )
+        return summary
+
+
+class Profiler:
+    """Opt-in wall time profiling of methods, by phase name.
+
+    instrument replaces methods of an object with timed wrappers stored on the
+    instance, restore removes them again. Objects that were never instrumented
+    run their methods unchanged, so profiling costs nothing while it is off.
+
+    Args:
+        max_samples: Wall times kept per phase for the percentiles.
+    """
+
+    def __init__(self, max_samples: int = 100_000):
+        self.max_samples = max_samples
+        self.phases = {}
+
+    def instrument(self, obj, names, prefix: str = ""):
+        """Time the methods names of obj as phases prefix + name."""
+        for name in names:
+            method = getattr(obj, name, None)
+            if method is not None:
+                setattr(obj, name, self.wrap(prefix + name, method))
+
+    @staticmethod
+    def restore(obj, names):
+        """Remove the wrappers instrument installed on obj."""
+        for name in names:
+            obj.__dict__.pop(name, None)
+
+    def wrap(self, phase: str, function):
+        """Timed version of function, recorded under phase."""
+        times = self.phases.setdefault(phase, PhaseTimes(self.max_samples))
+        perf_counter = time.perf_counter
+
+        @wraps(function)
+        def timed(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                times.add(perf_counter() - start)
+
+        return timed
+
+    def report(self) -> dict:
+        """Summary per phase: count, total, mean, max and percentiles in seconds."""
+        return {phase: times.summary() for phase, times in self.phases.items()}
+
+    def dump_json(self, path: str):
+        with open(path, "w") as file:
+            json.dump(self.report(), file, indent=2)
+
+    def reset(self):
+        """Forget the recorded times, wrappers keep recording into fresh phases."""
+        for times in self.phases.values():
+            times.__init__(self.max_samples)
@@ -0,0 +1,212 @@
+import argparse
+import json
+import multiprocessing as mp
+import os
+import shutil
+import subprocess
+import sys
+from concurrent.futures import Future, ProcessPoolExecutor
+
+FORMATS = ("mp4", "gif")
+
+# Environments of the worker process by recording config, each owns a renderer
+_worker_envs = {}
+
+
+class EpisodeExporter:
+    """Renders recorded episodes to video files in a pool of worker processes.
+
+    Episodes of a TrajectoryRecorder recording are re-simulated from their seed,
+    task options and actions. Every worker keeps one rgb_array environment, and
+    so one renderer, per recording config. For mp4 raw RGB frames are streamed
+    to an ffmpeg binary as they are rendered, for gif Pillow encodes the frames
+    in one call, so an episode is held in memory. Neither is a dependency of
+    craft2d, they are only needed by the format in use.
+
+    submit returns a Future right away, so training can keep stepping while the
+    workers render.
+
+    Args:
+        num_workers: Number of worker processes, defaults to the CPU count.
+        fps: Frames per second of the videos.
+        context: Multiprocessing start method, for example "fork" or "spawn".
+        ffmpeg: ffmpeg binary to run for mp4, looked up on the PATH by default.
+    """
+
+    def __init__(
+        self,
+        num_workers: int = None,
+        fps: int = 8,
+        context: str = None,
+        ffmpeg: str = "ffmpeg",
+    ):
+        self.fps = fps
+        self.ffmpeg = ffmpeg
+        self._executor = ProcessPoolExecutor(
+            max_workers=num_workers, mp_context=mp.get_context(context)
+        )
+
+    def submit(self, directory: str, index: int, path: str) -> Future:
+        """Export episode index of the recording in directory to path.
+
+        The format is taken from the extension of path, the future resolves to the
+        number of frames written.
+        """
+        video_format = os.path.splitext(path)[1].lstrip(".").lower()
+        if video_format not in FORMATS:
+            raise ValueError(f"Unknown video format: {path}, expected one of {FORMATS}")
+        if video_format == "mp4" and shutil.which(self.ffmpeg) is None:
+            raise FileNotFoundError(f"{self.ffmpeg} is needed to write mp4 videos.")
+
+        return self._executor.submit(
+            _export_episode, directory, index, path, video_format, self.fps, self.ffmpeg
+        )
+
+    def close(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def export_episodes(
+    directory: str,
+    episodes: list,
+    output_directory: str,
+    video_format: str = "mp4",
+    **exporter_kwargs,
+) -> list:
+    """Export episodes of a recording to output_directory and wait for them.
+
+    Returns the paths of the videos, named episode_{index}.{video_format}.
+    """
+    os.makedirs(output_directory, exist_ok=True)
+    paths = [
+        os.path.join(output_directory, f"episode_{index}.{video_format}")
+        for index in episodes
+    ]
+    with EpisodeExporter(**exporter_kwargs) as exporter:
+        futures = [
+            exporter.submit(directory, index, path)
+            for index, path in zip(episodes, paths)
+        ]
+        for future in futures:
+            future.result()
+    return paths
+
+
+def _export_episode(directory, index, path, video_format, fps, ffmpeg):
+    from craft2d.env.recorder import TrajectoryDataset
+
+    dataset = TrajectoryDataset(directory)
+    # Size, view radius and generator all change the replayed world
+    key = json.dumps(dataset.config, sort_keys=True)
+    if key not in _worker_envs:
+        _worker_envs[key] = dataset.make_env(render_mode="rgb_array")
+    env = _worker_envs[key]
+
+    def frames():
+        dataset.reset(index, env)
+        yield env.render()
+        for action in dataset.episode(index)["action"].tolist():
+            env.step(action)
+            yield env.render()
+
+    if video_format == "gif":
+        return _write_gif(frames(), path, fps)
+    return _write_ffmpeg(frames(), path, fps, ffmpeg)
+
+
+def _write_ffmpeg(frames, path, fps, ffmpeg):
+    n_frames = 0
+    process = None
+    for frame in frames:
+        if process is None:
+            height, width, _ = frame.shape
+            process = subprocess.Popen(
+                [
+                    ffmpeg,
+                    "-y",
+                    "-loglevel",
+                    "error",
+                    "-f",
+                    "rawvideo",
+                    "-pix_fmt",
+                    "rgb24",
+                    "-s",
+                    f"{width}x{height}",
+                    "-r",
+                    str(fps),
+                    "-i",
+                    "-",
+                    "-pix_fmt",
+                    "yuv420p",
+                    path,
+                ],
+                stdin=subprocess.PIPE,
+            )
+        process.stdin.write(frame.tobytes())
+        n_frames += 1
+
+    process.stdin.close()
+    if process.wait() != 0:
+        raise RuntimeError(f"{ffmpeg} exited with status {process.returncode}.")
+    return n_frames
+
+
+def _write_gif(frames, path, fps):
+    try:
+        from PIL import Image
+    except ImportError as error:
+        raise ImportError("Pillow is needed to write gif videos.") from error
+
+    # Pillow encodes a gif in one call, so every frame is kept until then
+    images = [Image.fromarray(frame) for frame in frames]
+    images[0].save(
+        path,
+        save_all=True,
+        append_images=images[1:],
+        duration=1000 // fps,
+        loop=0,
+    )
+    return len(images)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m craft2d.render.export",
+        description="Render episodes of a TrajectoryRecorder recording to videos.",
+    )
+    parser.add_argument("recording", help="Directory of the recording.")
+    parser.add_argument("output", help="Directory to write the videos to.")
+    parser.add_argument(
+        "--episodes", type=int, nargs="+", help="Episodes to export, default all."
+    )
+    parser.add_argument("--format", choices=FORMATS, default="mp4")
+    parser.add_argument("--fps", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    episodes = args.episodes
+    if episodes is None:
+        from craft2d.env.recorder import TrajectoryDataset
+
+        episodes = range(TrajectoryDataset(args.recording).n_episodes)
+
+    for path in export_episodes(
+        args.recording,
+        list(episodes),
+        args.output,
+        video_format=args.format,
+        num_workers=args.workers,
+        fps=args.fps,
+    ):
+        print(path, file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,5 @@
 import importlib.util
+from collections import OrderedDict
 from itertools import product
 from pathlib import Path
 
@@ -27,6 +28,9 @@ GEM_IMG_PATH = "resources/objects/gem.png"
 WEAPON_ADV_IMG_PATH = "resources/objects/weapon-advanced.png"
 PRINCESS_IMG_PATH = "resources/objects/princess.png"
 
+# Maximum number of rendered text surfaces kept by each renderer
+TEXT_CACHE_SIZE = 256
+
 
 def get_file_path(file_name):
     spec = importlib.util.find_spec("craft2d")
@@ -60,6 +64,14 @@ class Renderer:
             round(self.window_height / (self.n_rows + 2)),  # +2 for quest
         )
 
+        # Initialise pygame
+        pygame.init()
+        self.clock = pygame.time.Clock()
+
+        # Fonts by size and rendered text by (text, size, colour)
+        self._fonts = {}
+        self._text_cache = OrderedDict()
+
         # Load assets
         self.background_image = self._load_image(get_file_path(BACKGROUND_IMG_PATH))
         self.player_images = self._load_images(PLAYER_IMGS_PATH)
@@ -82,125 +94,189 @@ class Renderer:
         )
         self.princess_image = self._load_image(get_file_path(PRINCESS_IMG_PATH))
 
-        # Initialise pygame
-        pygame.init()
-        self.clock = pygame.time.Clock()
+        # Images drawn for each grid cell code, code 0 is an empty cell
+        self.background_tiles, self.object_tiles = self._build_tiles()
+        self.inventory_tiles = {
+            "wood": (self.wood_image, "Wood"),
+            "stone": (self.stone_image, "Stone"),
+            "grass": (self.grass_image, "Grass"),
+            "sticks": (self.sticks_image, "Sticks"),
+            "rope": (self.rope_image, "Rope"),
+            "bridge": (self.bridge_image, "Bridge"),
+            "weapon-basic": (self.weapon_basic_image, "Weapon"),
+            "gem": (self.gem_image, "Gem"),
+            "weapon-advanced": (self.weapon_advanced_image, "Weapon (Adv)"),
+        }
+
+        # Last rendered state, frames only redraw the regions that changed
+        self._last_grid = None
+        self._last_player = None
+        self._last_quest = None
+        self._inventory_counts = [None] * len(self.inv_objects)
+        self._inventory_items = [[] for _ in self.inv_objects]
+        self._quest_items = []
+
+        # Inventory images and labels never change, render them once
+        self.hud_layer = self._build_hud_layer()
+
+    def _render_frame(
+        self, grid, inventory, agent_position, direction, quest
+    ) -> list[pygame.Rect]:
+        """Draw the changes since the last frame, returns the updated regions."""
+        player = (
+            (int(agent_position[0]), int(agent_position[1])),
+            np.argmax(direction),
+        )
 
-    def _render_background(self, grid):
-        for r, c in product(range(self.n_rows), range(self.n_cols)):
-            if np.max(grid[r, c]) == 0:
-                self._render_cell(self.background_image, r, c)
-            else:
-                object_type = np.argmax(grid[r, c])
-                object_name = self.env_objects[object_type]
-
-                if object_name == "gem":
-                    self._render_cell(self.island_image, r, c)
-                elif object_name == "water":
-                    self._render_cell(self.water_image, r, c)
-                elif object_name == "bridge":
-                    self._render_cell(self.water_image, r, c)
-                    self._render_cell(self.bridge_image, r, c)
-                else:
-                    self._render_cell(self.background_image, r, c)
+        if self._last_grid is None or self._last_grid.shape != grid.shape:
+            dirty_rects = self._render_full_frame(grid, inventory, player, quest)
+        else:
+            dirty_rects = self._render_changes(grid, inventory, player, quest)
 
-    def _render_env_objects(self, grid):
-        for r, c in product(range(self.n_rows), range(self.n_cols)):
-            if np.max(grid[r, c]) == 0:
-                # Environmet cell is empty
-                continue
+        self._last_grid = np.array(grid, copy=True)
+        self._last_player = player
+        return dirty_rects
+
+    def invalidate(self):
+        """Force the next frame to be redrawn completely."""
+        self._last_grid = None
+
+    def _render_full_frame(self, grid, inventory, player, quest):
+        self._update_inventory(inventory)
+        self._update_quest(*quest)
+
+        self.window.fill((0, 0, 0))
+        self._render_background(grid)
+        self._render_env_objects(grid)
+        self._render_player(*player)
+        self._render_inventory()
+        self._render_quest()
+        return [self.window.get_rect()]
+
+    def _render_changes(self, grid, inventory, player, quest):
+        cells = {(r, c) for r, c in zip(*np.nonzero(grid != self._last_grid))}
+        if player != self._last_player:
+            cells.add(self._last_player[0])
+            cells.add(player[0])
+
+        dirty_rects = [self._cell_rect(r, c) for r, c in cells]
+        dirty_rects += self._update_inventory(inventory)
+        dirty_rects += self._update_quest(*quest)
+
+        for rect in dirty_rects:
+            self._render_region(rect, grid, player)
+        return dirty_rects
+
+    def _render_region(self, rect, grid, player):
+        # Redraw every layer that overlaps rect, in the order of a full frame
+        self.window.set_clip(rect)
+        self.window.fill((0, 0, 0))
+
+        cells = self._cells_in_rect(rect)
+        self._render_background(grid, cells)
+        self._render_env_objects(grid, cells)
+        if player[0] in cells:
+            self._render_player(*player)
+        self._render_inventory(rect)
+        self._render_quest(rect)
+
+        self.window.set_clip(None)
+
+    def _render_background(self, grid, cells=None):
+        if cells is None:
+            cells = product(range(self.n_rows), range(self.n_cols))
+
+        for r, c in cells:
+            for image in self.background_tiles[grid[r, c]]:
+                self._render_cell(image, r, c)
+
+    def _render_env_objects(self, grid, cells=None):
+        if cells is None:
+            cells = zip(*np.nonzero(grid))
 
-            object_type = np.argmax(grid[r, c])
-            object_name = self.env_objects[object_type]
-
-            if object_name == "tree":
-                self._render_cell(self.tree_image, r, c)
-            elif object_name == "stone":
-                self._render_cell(self.stone_image, r, c)
-            elif object_name == "grass":
-                self._render_cell(self.grass_image, r, c)
-            elif object_name == "crafting-table":
-                self._render_cell(self.crafting_table_image, r, c)
-            elif object_name == "gem":
-                self._render_cell(self.gem_image, r, c)
-            elif object_name == "princess":
-                self._render_cell(self.princess_image, r, c)
+        for r, c in cells:
+            image = self.object_tiles[grid[r, c]]
+            if image is not None:
+                self._render_cell(image, r, c)
 
     def _render_player(self, agent_position, direction):
         self._render_cell(
-            image=self.player_images[np.argmax(direction)],
+            image=self.player_images[direction],
             row=agent_position[0],
             col=agent_position[1],
         )
 
-    def _render_inventory(self, inventory):
-        for idx, count in enumerate(inventory):
-            object_name = self.inv_objects[idx]
-
-            if object_name == "wood":
-                self._render_cell(image=self.wood_image, row=idx, col=self.n_cols)
-                self._render_text(text="Wood", row=idx, col=self.n_cols, loc="top")
-            elif object_name == "stone":
-                self._render_cell(image=self.stone_image, row=idx, col=self.n_cols)
-                self._render_text(text="Stone", row=idx, col=self.n_cols, loc="top")
-            elif object_name == "grass":
-                self._render_cell(image=self.grass_image, row=idx, col=self.n_cols)
-                self._render_text(text="Grass", row=idx, col=self.n_cols, loc="top")
-            elif object_name == "sticks":
-                self._render_cell(image=self.sticks_image, row=idx, col=self.n_cols)
-                self._render_text(text="Sticks", row=idx, col=self.n_cols, loc="top")
-            elif object_name == "rope":
-                self._render_cell(image=self.rope_image, row=idx, col=self.n_cols)
-                self._render_text(text="Rope", row=idx, col=self.n_cols, loc="top")
-            elif object_name == "bridge":
-                self._render_cell(image=self.bridge_image, row=idx, col=self.n_cols)
-                self._render_text(text="Bridge", row=idx, col=self.n_cols, loc="top")
-            elif object_name == "weapon-basic":
-                self._render_cell(
-                    image=self.weapon_basic_image, row=idx, col=self.n_cols
-                )
-                self._render_text(text="Weapon", row=idx, col=self.n_cols, loc="top")
-            elif object_name == "gem":
-                self._render_cell(image=self.gem_image, row=idx, col=self.n_cols)
-                self._render_text(text="Gem", row=idx, col=self.n_cols, loc="top")
-            elif object_name == "weapon-advanced":
-                self._render_cell(
-                    image=self.weapon_advanced_image, row=idx, col=self.n_cols
-                )
-                self._render_text(
-                    text="Weapon (Adv)", row=idx, col=self.n_cols, loc="top"
-                )
+    def _render_inventory(self, clip=None):
+        for labels, counts in zip(self.hud_layer, self._inventory_items):
+            self._render_items(labels, clip)
+            self._render_items(counts, clip)
 
-            self._render_text(
-                text="X " + str(int(count)), row=idx, col=self.n_cols + 1, size=20
-            )
+    def _render_quest(self, clip=None):
+        self._render_items(self._quest_items, clip)
+
+    def _render_items(self, items, clip=None):
+        for surface, rect in items:
+            if clip is None or rect.colliderect(clip):
+                self.window.blit(surface, rect)
 
-    def _render_quest(
+    def _update_inventory(self, inventory):
+        """Rebuild the counts of changed inventory slots, returns their regions."""
+        dirty_rects = []
+
+        for idx, count in enumerate(inventory):
+            if self._inventory_counts[idx] == count:
+                continue
+
+            old_items = self._inventory_items[idx]
+            self._inventory_items[idx] = [
+                self._render_text(
+                    text="X " + str(int(count)), row=idx, col=self.n_cols + 1, size=20
+                ),
+            ]
+            self._inventory_counts[idx] = count
+            dirty_rects += [rect for _, rect in old_items + self._inventory_items[idx]]
+        return dirty_rects
+
+    def _update_quest(
         self, quest_set, quest_object, quest_object_count, completed, failed
     ):
+        """Rebuild the quest HUD items if the quest changed, returns their regions."""
+        quest = (quest_set, quest_object, quest_object_count, completed, failed)
+        if quest == self._last_quest:
+            return []
+
+        old_items = self._quest_items
+        self._last_quest = quest
+
         if not quest_set:
-            self._render_text(
-                "Quest not collected!",
-                row=self.n_rows,
-                col=(self.n_cols + 2) // 2,
-                size=40,
-            )
+            self._quest_items = [
+                self._render_text(
+                    "Quest not collected!",
+                    row=self.n_rows,
+                    col=(self.n_cols + 2) // 2,
+                    size=40,
+                )
+            ]
         elif completed:
-            self._render_text(
-                "Quest completed!",
-                row=self.n_rows,
-                col=(self.n_cols + 2) // 2,
-                size=40,
-                colour=(0, 255, 0),
-            )
+            self._quest_items = [
+                self._render_text(
+                    "Quest completed!",
+                    row=self.n_rows,
+                    col=(self.n_cols + 2) // 2,
+                    size=40,
+                    colour=(0, 255, 0),
+                )
+            ]
         elif failed:
-            self._render_text(
-                "Quest failed!",
-                row=self.n_rows,
-                col=(self.n_cols + 2) // 2,
-                size=40,
-                colour=(255, 0, 0),
-            )
+            self._quest_items = [
+                self._render_text(
+                    "Quest failed!",
+                    row=self.n_rows,
+                    col=(self.n_cols + 2) // 2,
+                    size=40,
+                    colour=(255, 0, 0),
+                )
+            ]
         else:
             if quest_object_count == "M1":
                 count = 1
@@ -236,24 +312,35 @@ class Renderer:
             else:
                 obj = "Unknown"
 
-            self._render_text(
-                "Quest:",
-                row=self.n_rows,
-                col=(self.n_cols + 2) // 2,
-                size=40,
-            )
-            self._render_text(
-                f"Collect {obj} x {count}",
-                row=self.n_rows + 1,
-                col=(self.n_cols + 2) // 2,
-                size=40,
-            )
+            self._quest_items = [
+                self._render_text(
+                    "Quest:",
+                    row=self.n_rows,
+                    col=(self.n_cols + 2) // 2,
+                    size=40,
+                ),
+                self._render_text(
+                    f"Collect {obj} x {count}",
+                    row=self.n_rows + 1,
+                    col=(self.n_cols + 2) // 2,
+                    size=40,
+                ),
+            ]
+        return [rect for _, rect in old_items + self._quest_items]
 
     def _render_text(
         self, text, row, col, size=20, loc="center", colour=(255, 255, 255)
     ):
-        font = pygame.font.Font(None, size)
-        text = font.render(text, True, colour)
+        """Render text to a surface, returns the surface and its HUD region."""
+        key = (text, size, colour)
+        if key in self._text_cache:
+            self._text_cache.move_to_end(key)
+            text = self._text_cache[key]
+        else:
+            text = self._get_font(size).render(text, True, colour)
+            self._text_cache[key] = text
+            if len(self._text_cache) > TEXT_CACHE_SIZE:
+                self._text_cache.popitem(last=False)
 
         if loc == "center":
             pos = (
@@ -266,7 +353,44 @@ class Renderer:
                 row * self.cell_size[1],
             )
 
-        self.window.blit(text, pos)
+        # Blits truncate float positions, Rect would round them
+        return text, text.get_rect(topleft=(int(pos[0]), int(pos[1])))
+
+    def _get_font(self, size):
+        if size not in self._fonts:
+            self._fonts[size] = pygame.font.Font(None, size)
+        return self._fonts[size]
+
+    def _build_hud_layer(self):
+        """Image and label items of each inventory slot."""
+        layer = []
+        for idx, object_name in enumerate(self.inv_objects):
+            image, label = self.inventory_tiles[object_name]
+            layer.append(
+                [
+                    (image, self._cell_rect(idx, self.n_cols)),
+                    self._render_text(text=label, row=idx, col=self.n_cols, loc="top"),
+                ]
+            )
+        return layer
+
+    def _cell_rect(self, row, col):
+        return pygame.Rect(
+            col * self.cell_size[0],
+            row * self.cell_size[1],
+            self.cell_size[0],
+            self.cell_size[1],
+        )
+
+    def _cells_in_rect(self, rect):
+        """Grid cells overlapping rect."""
+        first_row = max(rect.top // self.cell_size[1], 0)
+        last_row = min((rect.bottom - 1) // self.cell_size[1], self.n_rows - 1)
+        first_col = max(rect.left // self.cell_size[0], 0)
+        last_col = min((rect.right - 1) // self.cell_size[0], self.n_cols - 1)
+        return set(
+            product(range(first_row, last_row + 1), range(first_col, last_col + 1))
+        )
 
     def _render_cell(self, image, row, col):
         self.window.blit(
@@ -277,6 +401,30 @@ class Renderer:
             ),
         )
 
+    def _build_tiles(self):
+        background_images = {
+            "gem": (self.island_image,),
+            "water": (self.water_image,),
+            "bridge": (self.water_image, self.bridge_image),
+        }
+        object_images = {
+            "tree": self.tree_image,
+            "stone": self.stone_image,
+            "grass": self.grass_image,
+            "crafting-table": self.crafting_table_image,
+            "gem": self.gem_image,
+            "princess": self.princess_image,
+        }
+
+        background_tiles = [(self.background_image,)]
+        object_tiles = [None]
+        for object_name in self.env_objects:
+            background_tiles.append(
+                background_images.get(object_name, (self.background_image,))
+            )
+            object_tiles.append(object_images.get(object_name))
+        return background_tiles, object_tiles
+
     def _load_image(self, path, size=None):
         return pygame.transform.scale(
             pygame.image.load(path),
@@ -327,24 +475,29 @@ class HumanRenderer(Renderer):
         completed: bool = False,
         failed: bool = False,
     ):
-        self.window.fill((0, 0, 0))
-        self._render_background(grid)
-        self._render_env_objects(grid)
-        self._render_player(agent_position, direction)
-        self._render_inventory(inventory)
-        self._render_quest(
-            quest_set, quest_object, quest_object_count, completed, failed
+        dirty_rects = self._render_frame(
+            grid,
+            inventory,
+            agent_position,
+            direction,
+            (quest_set, quest_object, quest_object_count, completed, failed),
         )
-        self._handle_events()
+        self._handle_events(dirty_rects)
 
-    def _handle_events(self):
+    def _handle_events(self, dirty_rects):
         self.clock.tick(self.fps)
-        pygame.display.update()
+        self._update_display(dirty_rects)
 
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 pygame.quit()
                 exit()
+            elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                # Window contents were lost, redraw everything next frame
+                self.invalidate()
+
+    def _update_display(self, dirty_rects):
+        pygame.display.update(dirty_rects)
 
 
 class RgbRenderer(Renderer):
@@ -364,14 +517,219 @@ class RgbRenderer(Renderer):
         completed: bool = False,
         failed: bool = False,
     ):
-        self.window.fill((0, 0, 0))
-        self._render_background(grid)
-        self._render_env_objects(grid)
-        self._render_player(agent_position, direction)
-        self._render_inventory(inventory)
-        self._render_quest(
-            quest_set, quest_object, quest_object_count, completed, failed
+        self._render_frame(
+            grid,
+            inventory,
+            agent_position,
+            direction,
+            (quest_set, quest_object, quest_object_count, completed, failed),
         )
         return np.transpose(
             np.array(pygame.surfarray.pixels3d(self.window)), axes=(1, 0, 2)
         )
+
+
+class NumpyRenderer(Renderer):
+    """Headless renderer that builds RGB frames from a NumPy tile atlas.
+
+    Pygame is only used at construction to decode the sprites and compose every
+    cell and HUD variant once, frames are then assembled by indexing the atlas
+    with the grid cell codes. Frames match those of RgbRenderer as long as the
+    quest text stays below the grid, which holds for the default window size.
+    Small pixel observations can drop the HUD with show_hud=False.
+    """
+
+    def __init__(self, show_hud: bool = True, **kwargs: dict):
+        super().__init__(**kwargs)
+        self.show_hud = show_hud
+        self.window = pygame.Surface((self.window_width, self.window_height))
+        self._window_rect = self.window.get_rect()
+        self._no_player = ((-1, -1), 0)
+
+        # Tile ids are code * 5 + player, player is 0 if absent else direction + 1
+        self._n_codes = len(self.env_objects) + 1
+        self._tile_atlas = self._build_tile_atlas()
+        self._overlay_atlases = self._build_overlay_atlases() if show_hud else {}
+
+        # Static background: black with the inventory images and labels
+        self.window.fill((0, 0, 0))
+        if show_hud:
+            self._render_inventory()
+        self._base_frame = self._read_region(self._window_rect)
+
+        self._count_regions = [
+            self._cell_rect(idx, self.n_cols + 1)
+            .union(self._render_text(text="X 999", row=idx, col=self.n_cols + 1)[1])
+            .clip(self._window_rect)
+            for idx in range(len(self.inv_objects))
+        ]
+        self._count_patches = [
+            np.zeros((0, region.height, region.width, 3), dtype=np.uint8)
+            for region in self._count_regions
+        ]
+        self._quest_patches = {}
+
+    def render(
+        self,
+        grid,
+        inventory,
+        agent_position,
+        direction,
+        quest_set: bool = False,
+        quest_object: str = None,
+        quest_object_count: int = 0,
+        completed: bool = False,
+        failed: bool = False,
+    ):
+        return self.render_batch(
+            grids=np.asarray(grid)[None],
+            inventories=np.asarray(inventory)[None],
+            agent_positions=np.asarray(agent_position)[None],
+            directions=np.asarray(direction)[None],
+            quests=[(quest_set, quest_object, quest_object_count, completed, failed)],
+        )[0]
+
+    def render_batch(
+        self,
+        grids: np.ndarray,
+        inventories: np.ndarray,
+        agent_positions: np.ndarray,
+        directions: np.ndarray,
+        quests: list[tuple] = None,
+    ) -> np.ndarray:
+        """Render N frames with shape (N, window_height, window_width, 3).
+
+        Args:
+            grids: Cell codes with shape (N, n_rows, n_cols).
+            inventories: Inventory counts with shape (N, n_inv_objects).
+            agent_positions: Agent (row, col) with shape (N, 2).
+            directions: One-hot agent directions with shape (N, 4).
+            quests: (quest_set, quest_object, quest_object_count, completed,
+                failed) for each env, None renders every quest as not collected.
+        """
+        n_envs = len(grids)
+        env_idx = np.arange(n_envs)
+        frames = np.empty((n_envs,) + self._base_frame.shape, dtype=np.uint8)
+        frames[:] = self._base_frame
+
+        # Grid cells, player tiles are drawn over the cell they stand on
+        tile_ids = grids.astype(np.intp) * 5
+        tile_ids[env_idx, agent_positions[:, 0], agent_positions[:, 1]] += (
+            np.argmax(directions, axis=1) + 1
+        )
+        height = min(self.n_rows * self.cell_size[1], self.window_height)
+        width = min(self.n_cols * self.cell_size[0], self.window_width)
+        frames[:, :height, :width] = (
+            self._tile_atlas[tile_ids]
+            .transpose(0, 1, 3, 2, 4, 5)
+            .reshape(n_envs, self.n_rows * self.cell_size[1], -1, 3)[:, :height, :width]
+        )
+        for (r, c), (region, atlas) in self._overlay_atlases.items():
+            frames[:, region.top : region.bottom, region.left : region.right] = atlas[
+                tile_ids[:, r, c]
+            ]
+
+        if not self.show_hud:
+            return frames
+
+        # Inventory counts
+        counts = np.clip(inventories.astype(np.intp), 0, 999)
+        for idx, region in enumerate(self._count_regions):
+            patches = self._get_count_patches(idx, counts[:, idx].max())
+            frames[:, region.top : region.bottom, region.left : region.right] = patches[
+                counts[:, idx]
+            ]
+
+        # Quest text, envs are grouped by quest
+        if quests is None:
+            quests = [(False, None, 0, False, False)] * n_envs
+        quest_envs = {}
+        for idx, quest in enumerate(quests):
+            quest_envs.setdefault(tuple(quest), []).append(idx)
+        for quest, idx in quest_envs.items():
+            region, patch = self._get_quest_patch(quest)
+            frames[idx, region.top : region.bottom, region.left : region.right] = patch
+        return frames
+
+    def _build_tile_atlas(self):
+        window = self.window
+        self.window = pygame.Surface(self.cell_size)
+        atlas = np.zeros(
+            (self._n_codes * 5, self.cell_size[1], self.cell_size[0], 3),
+            dtype=np.uint8,
+        )
+
+        for code, player in product(range(self._n_codes), range(5)):
+            grid = np.array([[code]])
+            self.window.fill((0, 0, 0))
+            self._render_background(grid, [(0, 0)])
+            self._render_env_objects(grid, [(0, 0)])
+            if player > 0:
+                self._render_player((0, 0), player - 1)
+            atlas[code * 5 + player] = self._read_region(self.window.get_rect())
+
+        self.window = window
+        return atlas
+
+    def _build_overlay_atlases(self):
+        """Atlases of grid cells that HUD items are drawn over."""
+        hud_rects = [rect for items in self.hud_layer for _, rect in items]
+        atlases = {}
+
+        for r, c in product(range(self.n_rows), range(self.n_cols)):
+            region = self._cell_rect(r, c).clip(self._window_rect)
+            if region.collidelist(hud_rects) < 0:
+                continue
+
+            atlas = np.zeros(
+                (self._n_codes * 5, region.height, region.width, 3), dtype=np.uint8
+            )
+            for code, direction in product(range(self._n_codes), range(5)):
+                grid = np.full((self.n_rows, self.n_cols), code)
+                if direction > 0:
+                    player = ((r, c), direction - 1)
+                else:
+                    player = self._no_player
+                self._render_region(region, grid, player)
+                atlas[code * 5 + direction] = self._read_region(region)
+            atlases[(r, c)] = (region, atlas)
+        return atlases
+
+    def _get_count_patches(self, idx, max_count):
+        patches = self._count_patches[idx]
+        if max_count < len(patches):
+            return patches
+
+        region = self._count_regions[idx]
+        grid = np.zeros((self.n_rows, self.n_cols), dtype=np.int8)
+        inventory = np.array(self._inventory_counts, dtype=object)
+
+        new_patches = []
+        for count in range(len(patches), max_count + 1):
+            inventory[idx] = count
+            self._update_inventory(inventory)
+            self._render_region(region, grid, self._no_player)
+            new_patches.append(self._read_region(region))
+
+        self._count_patches[idx] = np.concatenate([patches, np.stack(new_patches)])
+        return self._count_patches[idx]
+
+    def _get_quest_patch(self, quest):
+        if quest not in self._quest_patches:
+            self._update_quest(*quest)
+            region = self._quest_items[0][1].unionall(
+                [rect for _, rect in self._quest_items]
+            )
+            region = region.clip(self._window_rect)
+
+            grid = np.zeros((self.n_rows, self.n_cols), dtype=np.int8)
+            self._render_region(region, grid, self._no_player)
+            self._quest_patches[quest] = (region, self._read_region(region))
+        return self._quest_patches[quest]
+
+    def _read_region(self, rect):
+        return np.ascontiguousarray(
+            np.transpose(
+                pygame.surfarray.array3d(self.window.subsurface(rect)), axes=(1, 0, 2)
+            )
+        )
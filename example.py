@@ -9,17 +9,6 @@ from craft2d.env.environment import Craft2dEnv
 TASK = "make-basic-weapon"
 
 
-def get_rep(o):
-    return tuple(
-        (
-            tuple(o[0].flatten()),
-            # tuple(np.array([0, 0, 0]).flatten()),
-            tuple(o[1].flatten()),
-            tuple(o[2].flatten()),
-        )
-    )
-
-
 def eval(Q, env):
     done = False
     o = env.reset()
@@ -28,7 +17,7 @@ def eval(Q, env):
         if done:
             break
 
-        a = np.argmax(Q[get_rep(o)])
+        a = np.argmax(Q[o])
         o_prime, r, done = env.step(a)
 
         o = o_prime
@@ -45,7 +34,7 @@ def render_eval(Q, env):
         if done:
             break
 
-        a = np.argmax(Q[get_rep(o)])
+        a = np.argmax(Q[o])
         o_prime, r, done = env.step(a)
 
         env.render()
@@ -57,8 +46,8 @@ def render_eval(Q, env):
 if __name__ == "__main__":
     Q = defaultdict(lambda: np.zeros(5))
 
-    # env = Craft2dEnv(10, 10, render_mode=None)
-    env = Craft2dEnv(10, 10, render_mode="human")
+    # env = Craft2dEnv(10, 10, render_mode=None, observation_mode="encoded")
+    env = Craft2dEnv(10, 10, render_mode="human", observation_mode="encoded")
 
     pbar = tqdm(range(1000000))
     rewards = []
@@ -70,16 +59,16 @@ if __name__ == "__main__":
         o = env.reset()
         done = False
 
-        # print(get_rep(o))
+        # print(o)
 
         env.render()
 
         for t in range(5000):
-            # print(get_rep(o))
+            # print(o)
             if done:
                 break
 
-            if get_rep(o) not in Q:
+            if o not in Q:
                 hit_count.append(0)
             else:
                 hit_count.append(1)
@@ -87,20 +76,18 @@ if __name__ == "__main__":
             # if np.random.random() < 0.5:
             #     a = np.random.choice([0, 1, 2, 3, 4])
             # else:
-            #     a = np.argmax(Q[get_rep(o)])
+            #     a = np.argmax(Q[o])
 
             a = int(input())
 
             o_prime, r, done = env.step(a)
 
             if r == 1:
-                # print("Updating ", get_rep(o), a, r, Q[get_rep(o)][a])
+                # print("Updating ", o, a, r, Q[o][a])
 
-                Q[get_rep(o)][a] += 0.01 * (r - Q[get_rep(o)][a])
+                Q[o][a] += 0.01 * (r - Q[o][a])
             else:
-                Q[get_rep(o)][a] += 0.01 * (
-                    (r + 0.999 * np.max(Q[get_rep(o_prime)])) - Q[get_rep(o)][a]
-                )
+                Q[o][a] += 0.01 * ((r + 0.999 * np.max(Q[o_prime])) - Q[o][a])
 
             o = o_prime
 